@@ -0,0 +1,132 @@
+"""
+Batched Artifact Writer
+=======================
+
+Coalesces MongoDB log writes and PostgreSQL progress updates emitted by the
+task poller into periodic bulk writes, so the event loop never waits on a
+per-record network round-trip.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+
+class AsyncArtifactWriter:
+    """
+    Queue logs and progress rows and flush them in batches.
+
+    A background task flushes every ``flush_ms`` milliseconds, or as soon as
+    either queue reaches ``max_batch`` entries. Flushes run the synchronous
+    adapter bulk methods in a worker thread.
+    """
+
+    def __init__(
+        self,
+        mongo_adapter: Optional[Any] = None,
+        pg_adapter: Optional[Any] = None,
+        flush_ms: int = 250,
+        max_batch: int = 200
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            mongo_adapter: Optional MongoDB adapter exposing write_logs(entries)
+            pg_adapter: Optional PostgreSQL adapter exposing add_progress_updates(updates)
+            flush_ms: Maximum time an entry waits before being flushed
+            max_batch: Queue size that triggers an immediate flush
+        """
+        self.mongo_adapter = mongo_adapter
+        self.pg_adapter = pg_adapter
+        self.flush_interval = flush_ms / 1000.0
+        self.max_batch = max_batch
+        self._logs: List[Dict[str, Any]] = []
+        self._progress: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "AsyncArtifactWriter":
+        """Start the background flush task on the running loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    def enqueue_log(
+        self,
+        level: str,
+        message: str,
+        task_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Queue a MongoDB log entry (same arguments as MongoAdapter.write_log)."""
+        if not self.mongo_adapter:
+            return
+        self._logs.append({
+            "level": level,
+            "message": message,
+            "task_id": task_id,
+            "metadata": metadata,
+            "created_at": datetime.utcnow()
+        })
+        if len(self._logs) >= self.max_batch:
+            self._wakeup.set()
+
+    def enqueue_progress(
+        self,
+        task_id: int,
+        agent_id: str,
+        progress_percent: float,
+        message: str,
+        data: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Queue a progress update (same arguments as PostgresAdapter.add_progress_update)."""
+        if not self.pg_adapter:
+            return
+        self._progress.append({
+            "task_id": task_id,
+            "agent_id": agent_id,
+            "progress_percent": progress_percent,
+            "message": message,
+            "data": data,
+            "timestamp": datetime.utcnow()
+        })
+        if len(self._progress) >= self.max_batch:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Write everything queued so far."""
+        async with self._flush_lock:
+            logs, self._logs = self._logs, []
+            progress, self._progress = self._progress, []
+            writes = []
+            if logs:
+                writes.append(asyncio.to_thread(self.mongo_adapter.write_logs, logs))
+            if progress:
+                writes.append(asyncio.to_thread(self.pg_adapter.add_progress_updates, progress))
+            if not writes:
+                return
+            for result in await asyncio.gather(*writes, return_exceptions=True):
+                if isinstance(result, Exception):
+                    print(f"⚠️  Failed to flush batched artifacts: {result}")
+
+    async def close(self) -> None:
+        """Stop the background task and flush anything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
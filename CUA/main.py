@@ -1,8 +1,15 @@
 import asyncio
+import atexit
+import hashlib
+import io
 import logging
+import logging.handlers
 import os
-import traceback
+import queue
 import signal
+import sys
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 from computer import Computer, VMProviderType
@@ -13,6 +20,9 @@ from agent import ComputerAgent
 # Import utility functions
 from utils import load_dotenv_files, handle_sigint
 
+# Import batched log/progress writer
+from artifact_writer import AsyncArtifactWriter
+
 # Import storage integration (optional)
 try:
     from storage_integration import execute_task_with_storage, initialize_storage_adapters
@@ -22,9 +32,56 @@ except ImportError:
     print("Note: Storage integration not available (storage adapters not found)")
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+# Callers only enqueue records; a listener thread does the stderr writes off the hot path
+_stderr_handler = logging.StreamHandler(sys.stderr)
+_stderr_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, _stderr_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+# Only merge args (and any traceback) into the message here; the stderr handler adds the level/name prefix
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
 logger = logging.getLogger(__name__)
 
+# Byte-identical system prefix sent ahead of every task so provider prompt caching can hit;
+# only the trailing user message varies between tasks
+SYSTEM_PROMPT = os.getenv(
+    "CUA_SYSTEM_PROMPT",
+    "You are a computer-use agent operating a remote Linux desktop. "
+    "Complete the user's task end to end using the computer tool, "
+    "and finish with a concise textual summary of the result."
+)
+STABLE_SYSTEM_MESSAGES = [
+    {
+        "role": "system",
+        "content": [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+    }
+]
+
+# Recent conversation per session, replayed ahead of the next task in the same session
+# so the provider's cached prefix covers earlier turns instead of re-prefilling them
+SESSION_HISTORY_MAX_SESSIONS = 128
+SESSION_HISTORY_MAX_TURNS = int(os.getenv("CUA_SESSION_HISTORY_TURNS", "4"))
+_session_history: "OrderedDict[str, list]" = OrderedDict()
+
+# Exact-match cache of final responses for repeated standalone task descriptions. Off by
+# default: a hit marks the task completed without touching the computer, so tasks with
+# side effects or time-dependent answers would get a stale canned reply
+RESPONSE_CACHE_MAX_ENTRIES = 10_000
+RESPONSE_CACHE_TTL = float(os.getenv("CUA_RESPONSE_CACHE_TTL", "0"))
+_response_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+# Upper bound on the textual response kept in memory per task
+MAX_RESPONSE_CHARS = 256 * 1024
+
+# Minimum spacing between mid-task progress updates
+PROGRESS_UPDATE_INTERVAL = 1.0
+
+# Process-wide agent, shared by the example flow and the task poller (see get_agent)
+_AGENT = None
+
 
 def validate_required_env_vars():
     """Validate that all required environment variables are present.
@@ -47,11 +104,208 @@ def validate_required_env_vars():
         )
 
 
+def _session_key(task: dict):
+    """Return the session a task belongs to, or None when it is standalone."""
+    metadata = task.get("metadata") or {}
+    key = task.get("session_id") or metadata.get("session_id") or task.get("user_id") or metadata.get("user_id")
+    return str(key) if key else None
+
+
+def _remember_session(key: str, messages: list):
+    """Store the last SESSION_HISTORY_MAX_TURNS turns for a session, evicting the least recent session."""
+    # Trim on user-message boundaries so tool calls are never separated from their outputs
+    user_turns = [i for i, m in enumerate(messages) if m.get("role") == "user"]
+    if len(user_turns) > SESSION_HISTORY_MAX_TURNS:
+        messages = messages[user_turns[-SESSION_HISTORY_MAX_TURNS]:]
+    _session_history[key] = messages
+    _session_history.move_to_end(key)
+    while len(_session_history) > SESSION_HISTORY_MAX_SESSIONS:
+        _session_history.popitem(last=False)
+
+
+def _response_cache_key(description: str) -> str:
+    """Key a task by the exact prompt the agent would see."""
+    return hashlib.blake2b((SYSTEM_PROMPT + "\0" + description).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _response_cache_get(key):
+    """Return a cached final response that has not expired, or None."""
+    if not key or RESPONSE_CACHE_TTL <= 0:
+        return None
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, response = entry
+    if expires_at < time.monotonic():
+        del _response_cache[key]
+        return None
+    _response_cache.move_to_end(key)
+    return response
+
+
+def _response_cache_put(key, response: str):
+    """Cache a final response for RESPONSE_CACHE_TTL seconds, evicting the least recent entry."""
+    if not key or RESPONSE_CACHE_TTL <= 0:
+        return
+    _response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, response)
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+        _response_cache.popitem(last=False)
+
+
+async def _run_agent_task(agent, history: list, turn: list, task_id, writer: AsyncArtifactWriter, agent_id: str) -> str:
+    """Stream the agent over history, logging outputs and appending them to turn; return the final text."""
+    response_buf = io.StringIO()
+    response_chars = 0
+    partial_outputs = 0
+    iterations = 0
+    last_progress_at = 0.0
+    async for result in agent.run(history, stream=False):
+        iterations += 1
+        output_items = result.get("output", []) or []
+        turn.extend(output_items)
+        # Process outputs and log them
+        for item in output_items:
+            itype = item.get("type", "")
+            if itype == "message":
+                content_parts = item.get("content", []) or []
+                for cp in content_parts:
+                    text = cp.get("text") if isinstance(cp, dict) else None
+                    if text:
+                        partial_outputs += 1
+                        if response_chars + len(text) <= MAX_RESPONSE_CHARS:
+                            response_buf.write(text)
+                            response_buf.write("\n\n")
+                            response_chars += len(text) + 2
+                        # Log message to MongoDB if available
+                        writer.enqueue_log(
+                            level="info",
+                            message=text[:1000],
+                            task_id=str(task_id),
+                            metadata={"agent_id": agent_id, "output_type": "message"}
+                        )
+            elif itype == "computer_call":
+                # store a short log about the action
+                writer.enqueue_log(
+                    level="info",
+                    message=f"computer_call: {item.get('action', {}).get('type', '')}"[:1000],
+                    task_id=str(task_id),
+                    metadata={"agent_id": agent_id, "action": item.get("action", {})}
+                )
+
+        # Periodic progress update, at most one per PROGRESS_UPDATE_INTERVAL
+        now = time.monotonic()
+        if now - last_progress_at >= PROGRESS_UPDATE_INTERVAL:
+            last_progress_at = now
+            writer.enqueue_progress(
+                task_id=task_id,
+                agent_id=agent_id,
+                # Rough estimate based on agent iterations; 100 is reserved for completion
+                progress_percent=min(90, 5 + 5 * iterations),
+                message="Agent produced partial output",
+                data={"partial_outputs": partial_outputs, "iterations": iterations}
+            )
+
+    # After streaming completes, assemble final response
+    return response_buf.getvalue().strip() or "(no textual output)"
+
+
+async def _process_one(t: dict, sem: asyncio.Semaphore, agent, pg_adapter, writer: AsyncArtifactWriter, agent_id: str):
+    """Run the agent on one claimed task, holding a concurrency slot for the duration."""
+    # Normalize task id and description
+    task_id = t.get("id") or t.get("task_id") or t.get("taskId") or t.get("_id")
+    description = t.get("description") or t.get("title") or ""
+    if not task_id or not description:
+        return
+
+    async with sem:
+        # Add a progress update
+        writer.enqueue_progress(
+            task_id=task_id,
+            agent_id=agent_id,
+            progress_percent=1,
+            message="Agent picked up task",
+            data={"description": description}
+        )
+
+        # Run the agent on the task (message-based history), continuing the session if there is one
+        session_key = _session_key(t)
+        turn = (_session_history.get(session_key, []) if session_key else []) + [{"role": "user", "content": description}]
+        history = STABLE_SYSTEM_MESSAGES + turn
+        # Standalone tasks with an identical description reuse a recent answer instead of re-running the agent
+        cache_key = None if session_key else _response_cache_key(description)
+        try:
+            final_response = _response_cache_get(cache_key)
+            cache_hit = final_response is not None
+            if not cache_hit:
+                final_response = await _run_agent_task(agent, history, turn, task_id, writer, agent_id)
+                _response_cache_put(cache_key, final_response)
+                if session_key:
+                    _remember_session(session_key, turn)
+        except Exception as e:
+            # Mark failed and log; the status update and the batched log/progress flush are independent
+            final_response = None
+            err_text = str(e)
+            writer.enqueue_progress(
+                task_id=task_id,
+                agent_id=agent_id,
+                progress_percent=100,
+                message=f"Task failed: {err_text}",
+                data={"error": err_text}
+            )
+            writer.enqueue_log(level="error", message=f"Task failed: {err_text}", task_id=str(task_id), metadata={"agent_id": agent_id})
+            await asyncio.gather(
+                asyncio.to_thread(
+                    pg_adapter.update_task_status,
+                    task_id=task_id,
+                    status="failed",
+                    metadata={"error": err_text, "failed_at": datetime.utcnow().isoformat(), "agent_id": agent_id}
+                ),
+                writer.flush(),
+                return_exceptions=True
+            )
+            logger.error("Error executing task %s: %s", task_id, err_text, extra={"task_id": task_id})
+            return
+
+        # Persist final result and mark completed
+        try:
+            result_meta = {
+                "response_text": final_response,
+                "completed_at": datetime.utcnow().isoformat(),
+                "agent_id": agent_id,
+                "processing_method": "cua_agent_poll_cache" if cache_hit else "cua_agent_poll"
+            }
+            writer.enqueue_progress(
+                task_id=task_id,
+                agent_id=agent_id,
+                progress_percent=100,
+                message="Task completed",
+                data={"result": result_meta}
+            )
+            writer.enqueue_log(level="info", message=f"Task completed: {final_response[:1000]}", task_id=str(task_id), metadata={"agent_id": agent_id})
+            # Status update and the batched log/progress flush go out in parallel
+            await asyncio.gather(
+                asyncio.to_thread(
+                    pg_adapter.update_task_status,
+                    task_id=task_id,
+                    status="completed",
+                    metadata={"result": result_meta, "completed_at": result_meta["completed_at"]}
+                ),
+                writer.flush()
+            )
+        except Exception as e:
+            logger.exception("Failed to persist completion for task %s", task_id, extra={"task_id": task_id})
+
+
 async def _poll_and_process_tasks(agent, storage_adapters: dict, agent_id: str, poll_interval: float = 5.0):
     """
     Poll Postgres for tasks assigned to this agent and process them.
-    - Expects pg adapter methods: get_tasks(agent_id=..., status=..., limit=...), update_task_status(...), add_progress_update(...)
-    - Expects mongo adapter method: write_log(level, message, task_id, metadata)
+    - Wakes on the 'new_task' NOTIFY channel when the pg adapter supports listen(...), else every poll_interval
+    - At most TASK_MAX_CONCURRENCY tasks run at once (default 1: every task drives the same agent and
+      Computer, so concurrent tasks would click over each other); only free slots are claimed
+    - Adapters are synchronous, so every adapter call runs in a worker thread to keep the loop free
+    - Expects pg adapter methods: claim_tasks(agent_id=..., limit=...), update_task_status(...), add_progress_updates(...)
+    - Expects mongo adapter method: write_logs(entries)
     """
     pg_adapter = storage_adapters.get("pg") if storage_adapters else None
     mongo_adapter = storage_adapters.get("mongo") if storage_adapters else None
@@ -61,166 +315,73 @@ async def _poll_and_process_tasks(agent, storage_adapters: dict, agent_id: str,
         print("⚠️  Poller disabled: Postgres adapter not available")
         return
 
-    print(f"🔁 Starting task poller for agent '{agent_id}', interval={poll_interval}s")
-    while True:
+    # Wake on Postgres NOTIFY when a task is inserted; the timeout is only a safety net
+    task_available = asyncio.Event()
+    listener = None
+    if hasattr(pg_adapter, "listen"):
         try:
-            # Fetch tasks assigned to this agent that are pending/assigned
-            tasks = []
-            try:
-                tasks = pg_adapter.get_tasks(agent_id=agent_id, status="assigned", limit=10) or []
-            except Exception:
-                # fallback: try pending
-                try:
-                    tasks = pg_adapter.get_tasks(agent_id=agent_id, status="pending", limit=10) or []
-                except Exception:
-                    tasks = []
-
-            for t in tasks:
-                # Normalize task id and description
-                task_id = t.get("id") or t.get("task_id") or t.get("taskId") or t.get("_id")
-                description = t.get("description") or t.get("title") or ""
-                if not task_id or not description:
-                    continue
-
-                # Avoid double-processing: check status again
-                current = pg_adapter.get_task(task_id) if hasattr(pg_adapter, "get_task") else None
-                cur_status = (current.get("status") if current else t.get("status")) or ""
-                if cur_status in ("in_progress", "completed"):
-                    continue
-
-                # Mark as in_progress
-                try:
-                    pg_adapter.update_task_status(
-                        task_id=task_id,
-                        status="in_progress",
-                        metadata={"started_at": datetime.utcnow().isoformat(), "agent_id": agent_id}
-                    )
-                except Exception as e:
-                    print(f"⚠️  Failed to mark task {task_id} in_progress: {e}")
-
-                # Add a progress update
-                try:
-                    pg_adapter.add_progress_update(
-                        task_id=task_id,
-                        agent_id=agent_id,
-                        progress_percent=1,
-                        message="Agent picked up task",
-                        data={"description": description}
-                    )
-                except Exception:
-                    pass
-
-                # Run the agent on the task (message-based history)
-                history = [{"role": "user", "content": description}]
-                collected_texts = []
-                try:
-                    async for result in agent.run(history, stream=False):
-                        output_items = result.get("output", []) or []
-                        # Process outputs and log them
-                        for item in output_items:
-                            itype = item.get("type", "")
-                            if itype == "message":
-                                content_parts = item.get("content", []) or []
-                                for cp in content_parts:
-                                    text = cp.get("text") if isinstance(cp, dict) else None
-                                    if text:
-                                        collected_texts.append(text)
-                                        # Log message to MongoDB if available
-                                        try:
-                                            if mongo_adapter:
-                                                mongo_adapter.write_log(
-                                                    level="info",
-                                                    message=text[:1000],
-                                                    task_id=str(task_id),
-                                                    metadata={"agent_id": agent_id, "output_type": "message"}
-                                                )
-                                        except Exception:
-                                            pass
-                            elif itype == "computer_call" and mongo_adapter:
-                                # store a short log about the action
-                                try:
-                                    mongo_adapter.write_log(
-                                        level="info",
-                                        message=f"computer_call: {item.get('action', {}).get('type', '')}"[:1000],
-                                        task_id=str(task_id),
-                                        metadata={"agent_id": agent_id, "action": item.get("action", {})}
-                                    )
-                                except Exception:
-                                    pass
-
-                        # Periodic progress update
-                        try:
-                            pg_adapter.add_progress_update(
-                                task_id=task_id,
-                                agent_id=agent_id,
-                                progress_percent=50,
-                                message="Agent produced partial output",
-                                data={"partial_outputs": len(collected_texts)}
-                            )
-                        except Exception:
-                            pass
-
-                    # After streaming completes, assemble final response
-                    final_response = "\n\n".join(collected_texts).strip() if collected_texts else "(no textual output)"
-                except Exception as e:
-                    # Mark failed and log
-                    final_response = None
-                    err_text = str(e)
-                    try:
-                        pg_adapter.update_task_status(
-                            task_id=task_id,
-                            status="failed",
-                            metadata={"error": err_text, "failed_at": datetime.utcnow().isoformat(), "agent_id": agent_id}
-                        )
-                        pg_adapter.add_progress_update(
-                            task_id=task_id,
-                            agent_id=agent_id,
-                            progress_percent=100,
-                            message=f"Task failed: {err_text}",
-                            data={"error": err_text}
-                        )
-                        if mongo_adapter:
-                            mongo_adapter.write_log(level="error", message=f"Task failed: {err_text}", task_id=str(task_id), metadata={"agent_id": agent_id})
-                    except Exception:
-                        pass
-                    print(f"❌ Error executing task {task_id}: {err_text}")
-                    continue
-
-                # Persist final result and mark completed
-                try:
-                    result_meta = {
-                        "response_text": final_response,
-                        "completed_at": datetime.utcnow().isoformat(),
-                        "agent_id": agent_id,
-                        "processing_method": "cua_agent_poll"
-                    }
-                    pg_adapter.update_task_status(
-                        task_id=task_id,
-                        status="completed",
-                        metadata={"result": result_meta, "completed_at": result_meta["completed_at"]}
-                    )
-                    pg_adapter.add_progress_update(
-                        task_id=task_id,
-                        agent_id=agent_id,
-                        progress_percent=100,
-                        message="Task completed",
-                        data={"result": result_meta}
-                    )
-                    if mongo_adapter:
-                        mongo_adapter.write_log(level="info", message=f"Task completed: {final_response[:1000]}", task_id=str(task_id), metadata={"agent_id": agent_id})
-                except Exception as e:
-                    print(f"⚠️  Failed to persist completion for task {task_id}: {e}")
-
+            listener = pg_adapter.listen("new_task", lambda _payload: task_available.set())
         except Exception as e:
-            print(f"⚠️  Poller error: {e}")
-        await asyncio.sleep(poll_interval)
-
-
-async def run_agent_example():
-    """Run example of using the ComputerAgent with different models."""
-    print("\n=== Example: ComputerAgent with different models ===")
-
+            print(f"⚠️  LISTEN unavailable, falling back to interval polling: {e}")
+    wait_timeout = float(os.getenv("TASK_POLL_FALLBACK_INTERVAL", "60.0")) if listener else poll_interval
+
+    # All tasks share one ComputerAgent and its Computer, so only raise this when each
+    # slot drives its own desktop
+    max_concurrency = max(1, int(os.getenv("TASK_MAX_CONCURRENCY", "1")))
+    sem = asyncio.Semaphore(max_concurrency)
+    in_flight: set = set()
+
+    def _task_done(task: asyncio.Task) -> None:
+        in_flight.discard(task)
+        # A freed slot can take the next pending task
+        task_available.set()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Task processing crashed: %s", task.exception(), extra={"agent_id": agent_id})
+
+    # Logs and progress rows are batched; status transitions stay synchronous
+    writer = AsyncArtifactWriter(mongo_adapter=mongo_adapter, pg_adapter=pg_adapter, flush_ms=250, max_batch=200).start()
+
+    print(f"🔁 Starting task poller for agent '{agent_id}', "
+          f"{'notify-driven' if listener else 'interval'} wake every {wait_timeout}s at most")
     try:
+        while True:
+            task_available.clear()
+            free_slots = max_concurrency - len(in_flight)
+            try:
+                # Claim only as many pending/assigned tasks as can start now; claimed rows are already in_progress
+                tasks = []
+                if free_slots > 0:
+                    tasks = await asyncio.to_thread(pg_adapter.claim_tasks, agent_id=agent_id, limit=free_slots) or []
+
+                for t in tasks:
+                    task = asyncio.create_task(_process_one(t, sem, agent, pg_adapter, writer, agent_id))
+                    in_flight.add(task)
+                    task.add_done_callback(_task_done)
+
+            except Exception as e:
+                logger.exception("Poller error", extra={"agent_id": agent_id})
+                tasks = []
+            # Anything beyond this claim was already NOTIFYed, so claim again while slots are free
+            if tasks and len(in_flight) < max_concurrency:
+                continue
+            try:
+                await asyncio.wait_for(task_available.wait(), timeout=wait_timeout)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if listener is not None:
+            pg_adapter.unlisten(listener)
+        for task in list(in_flight):
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        # Runs on cancellation too, so SIGINT shutdown still lands queued writes
+        await writer.close()
+
+
+def get_agent():
+    """Return the process-wide ComputerAgent, creating it (and its Computer) on first use."""
+    global _AGENT
+    if _AGENT is None:
         # Create a remote Linux computer with Cua
         computer = Computer(
             os_type="linux",
@@ -231,15 +392,35 @@ async def run_agent_example():
 
         # Create ComputerAgent with OpenAI CUA
         # If you wish to change the model, please refer to the following documentation: https://docs.cua.ai/docs/agent-sdk/supported-model-providers
-        agent = ComputerAgent(
+        _AGENT = ComputerAgent(
             model="omniparser+openai/gpt-4o",
             tools=[computer],
-            only_n_most_recent_images=3,
+            # Older screenshots are dropped from the prompt, keeping the cached prefix stable
+            only_n_most_recent_images=int(os.getenv("CUA_ONLY_N_MOST_RECENT_IMAGES", "3")),
             verbosity=logging.DEBUG,
             trajectory_dir="trajectories",
             use_prompt_caching=True,
             max_trajectory_budget=1.0,
         )
+    return _AGENT
+
+
+async def _prewarm(agent):
+    """Issue one throwaway run so connections and the cached system prefix are hot before real tasks."""
+    try:
+        async for _ in agent.run(STABLE_SYSTEM_MESSAGES + [{"role": "user", "content": "ping"}], stream=False):
+            break
+    except Exception as e:
+        logger.warning("Agent prewarm failed: %s", e)
+
+
+async def run_agent_example():
+    """Run example of using the ComputerAgent with different models."""
+    print("\n=== Example: ComputerAgent with different models ===")
+
+    try:
+        # Reuse the process-wide agent so its tools and connections stay warm across tasks
+        agent = get_agent()
 
         # Example tasks to demonstrate the agent
         tasks = [
@@ -268,12 +449,14 @@ async def run_agent_example():
         
         # Start background poller only when Postgres adapter exists
         if storage_adapters and storage_adapters.get("pg"):
+            if os.getenv("CUA_PREWARM", "1") == "1":
+                await _prewarm(agent)
             # spawn the poller but don't block the example main flow
             asyncio.create_task(_poll_and_process_tasks(agent, storage_adapters, agent_id, poll_interval=float(os.getenv("TASK_POLL_INTERVAL", "5.0"))))
             print("🔁 Task poller started in background")
 
-        # Use message-based conversation history
-        history = []
+        # Use message-based conversation history behind the cacheable system prefix
+        history = list(STABLE_SYSTEM_MESSAGES)
         
         for i, task in enumerate(tasks):
             print(f"\nExecuting task {i+1}/{len(tasks)}: {task}")
@@ -302,8 +485,8 @@ async def run_agent_example():
                     print(f"  Progress updates: {result.get('progress_updates', 0)}")
                     
                 except Exception as e:
-                    logger.error(f"Error executing task with storage: {e}")
-                    traceback.print_exc()
+                    # Traceback is logged once, by main()
+                    logger.error("Error executing task with storage: %s", e)
                     raise
             else:
                 # Fallback to original execution without storage
@@ -332,8 +515,7 @@ async def run_agent_example():
                 print(f"✅ Task {i+1}/{len(tasks)} completed: {task}")
 
     except Exception as e:
-        logger.error(f"Error in run_agent_example: {e}")
-        traceback.print_exc()
+        logger.error("Error in run_agent_example: %s", e)
         raise
 
 
@@ -350,8 +532,7 @@ def main():
 
         asyncio.run(run_agent_example())
     except Exception as e:
-        print(f"Error running example: {e}")
-        traceback.print_exc()
+        logger.exception("Error running example: %s", e)
 
 
 if __name__ == "__main__":
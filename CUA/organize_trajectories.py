@@ -9,14 +9,31 @@ This script watches a directory for new trajectory files and organizes them into
 """
 
 import json
-import time
+import os
+import errno
 import shutil
+import re
+import queue
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Set
+from typing import Dict, List, Optional, Tuple
 import logging
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,13 +42,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Filename pattern that decides the category without opening the file
+SCREENSHOT_RE = re.compile(r"(screenshot|computer_call_result|annotated)", re.I)
+
+# Top-level keys that mark a trajectory file as a screenshot
+SCREENSHOT_KEYS = frozenset({"screenshot", "image", "image_path", "screenshot_path"})
+
+# Files at least this large are stream-parsed (when ijson is available) instead of fully loaded
+STREAM_PARSE_MIN_BYTES = 256 * 1024
+
+# Upper bound on remembered source paths for long-running watchers
+MAX_PROCESSED_FILES = 10_000
+
+# Per-type counters persisted in the output directory so restarts never reuse a number
+COUNTER_FILENAME = ".trajectory_counters"
+
+# New files are buffered and moved in batches of up to MAX_BATCH_SIZE, flushed
+# once no new file has arrived for DRAIN_INTERVAL seconds
+MAX_BATCH_SIZE = 64
+DRAIN_INTERVAL = 0.1
+
 class TrajectoryOrganizer(FileSystemEventHandler):
     def __init__(self, watch_dir: Path, output_dir: Optional[Path] = None):
         self.watch_dir = watch_dir
         # Set default output directory to CUA/organized_traj if not specified
         default_output = Path(__file__).parent / 'organized_traj'
         self.output_dir = output_dir or default_output
-        self.processed_files: Set[str] = set()
+        self.processed_files: "OrderedDict[str, None]" = OrderedDict()
         self.counters = {
             'progress': 0,
             'screenshot': 0,
@@ -40,25 +77,65 @@ class TrajectoryOrganizer(FileSystemEventHandler):
         
         # Ensure output directory exists
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.counter_path = self.output_dir / COUNTER_FILENAME
+        self._load_counters()
         
         # Process any existing files
         self._process_existing_files()
+        
+        # Created-file events are queued and drained in batches
+        self._pending: "queue.Queue[Path]" = queue.Queue()
+        self._stopped = threading.Event()
+        self._drainer = threading.Thread(target=self._drain_loop, daemon=True)
+        self._drainer.start()
     
-    def _get_next_filename(self, file_type: str) -> Path:
-        """Generate the next filename for the given type."""
-        self.counters[file_type] += 1
-        return self.output_dir / f"trajectory_{file_type}_{self.counters[file_type]}.json"
+    def _load_counters(self):
+        """Resume numbering from the persisted counter file, if any."""
+        try:
+            saved = json.loads(self.counter_path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not read {self.counter_path}: {e}")
+            return
+        for file_type in self.counters:
+            self.counters[file_type] = max(self.counters[file_type], int(saved.get(file_type, 0)))
+    
+    def _save_counters(self):
+        """Persist the counters atomically."""
+        tmp_path = self.counter_path.with_name(COUNTER_FILENAME + ".tmp")
+        if ORJSON_AVAILABLE:
+            tmp_path.write_bytes(orjson.dumps(self.counters))
+        else:
+            tmp_path.write_text(json.dumps(self.counters), encoding='utf-8')
+        os.replace(tmp_path, self.counter_path)
+    
+    def _get_next_filename(self, file_type: str) -> Tuple[int, Path]:
+        """Return the next number and filename for the given type, without claiming it."""
+        number = self.counters[file_type] + 1
+        return number, self.output_dir / f"trajectory_{file_type}_{number}.json"
     
     def _classify_file(self, file_path: Path) -> Optional[str]:
         """Classify a file into one of the categories."""
+        # Check the filename before reading anything
+        name = file_path.name
+        if SCREENSHOT_RE.search(name):
+            return "screenshot"
+        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            size = file_path.stat().st_size
+            if IJSON_AVAILABLE and size >= STREAM_PARSE_MIN_BYTES:
+                return self._classify_stream(file_path)
+            
+            # Byte-level hints can't tell top-level keys from nested ones, so every
+            # remaining file is parsed and judged by the rules below
+            raw = file_path.read_bytes()
+            if ORJSON_AVAILABLE:
+                # orjson.JSONDecodeError subclasses json.JSONDecodeError
+                data = orjson.loads(raw)
+            else:
+                data = json.loads(raw.decode('utf-8'))
             
-            # Check for screenshot-like files
-            if any(k in str(file_path).lower() for k in ["screenshot", "computer_call_result", "annotated"]):
-                return "screenshot"
-                
             if isinstance(data, dict):
                 # Check for agent progress (agent responses)
                 if "output" in data and isinstance(data["output"], list):
@@ -68,7 +145,7 @@ class TrajectoryOrganizer(FileSystemEventHandler):
                                 return "progress"
                 
                 # Check for screenshots in content
-                if any(k in data for k in ["screenshot", "image", "image_path", "screenshot_path"]):
+                if data.keys() & SCREENSHOT_KEYS:
                     return "screenshot"
                 
                 # Check for role-based messages
@@ -81,40 +158,118 @@ class TrajectoryOrganizer(FileSystemEventHandler):
             logger.warning(f"Could not parse {file_path}: {e}")
             return "other"
         except Exception as e:
+            if IJSON_AVAILABLE and isinstance(e, ijson.JSONError):
+                logger.warning(f"Could not parse {file_path}: {e}")
+                return "other"
             logger.error(f"Error processing {file_path}: {e}", exc_info=True)
             return None
     
-    def _process_file(self, file_path: Path):
-        """Process a single file."""
-        if not file_path.is_file() or file_path.suffix.lower() != '.json':
-            return
+    def _classify_stream(self, file_path: Path) -> str:
+        """Classify by streaming parse events, stopping at the first agent message."""
+        has_screenshot_key = False
+        is_assistant = False
+        in_message = False
+        has_content = False
+        
+        with open(file_path, 'rb') as f:
+            for prefix, event, value in ijson.parse(f):
+                if prefix == 'output.item':
+                    if event == 'start_map':
+                        in_message = has_content = False
+                    elif event == 'end_map' and in_message and has_content:
+                        # Agent progress (agent responses) outranks every other signal
+                        return "progress"
+                elif prefix == 'output.item.type':
+                    in_message = value == "message"
+                elif prefix.startswith('output.item.content'):
+                    if prefix != 'output.item.content' or event == 'map_key' or (
+                        event in ('string', 'number', 'boolean') and value
+                    ):
+                        has_content = True
+                elif prefix == '' and event == 'map_key':
+                    if value in SCREENSHOT_KEYS:
+                        has_screenshot_key = True
+                elif prefix == 'role' and value == "assistant":
+                    is_assistant = True
+        
+        if has_screenshot_key:
+            return "screenshot"
+        if is_assistant:
+            return "progress"
+        return "other"
+    
+    def _process_batch(self, file_paths: List[Path]):
+        """Classify a batch of files, then move them grouped by destination type."""
+        by_type: Dict[str, List[Tuple[Path, str]]] = {}
+        for file_path in file_paths:
+            if not file_path.is_file() or file_path.suffix.lower() != '.json':
+                continue
             
-        if str(file_path.absolute()) in self.processed_files:
-            return
+            src_key = os.fspath(file_path)
+            if src_key in self.processed_files:
+                continue
             
-        file_type = self._classify_file(file_path)
-        if not file_type:
+            file_type = self._classify_file(file_path)
+            if not file_type:
+                continue
+            by_type.setdefault(file_type, []).append((file_path, src_key))
+        
+        if not by_type:
             return
-            
-        # Get the next filename for this type
-        dest_path = self._get_next_filename(file_type)
         
-        try:
-            # Move the file to its new location
-            shutil.move(str(file_path), str(dest_path))
-            self.processed_files.add(str(file_path.absolute()))
-            logger.info(f"Moved {file_path.name} to {dest_path.name}")
-        except Exception as e:
-            logger.error(f"Failed to move {file_path}: {e}")
+        moved = False
+        for file_type, entries in by_type.items():
+            for file_path, src_key in entries:
+                # Get the next filename for this type
+                number, dest_path = self._get_next_filename(file_type)
+                
+                try:
+                    # Atomic rename when the output directory shares the filesystem
+                    try:
+                        os.replace(file_path, dest_path)
+                    except OSError as e:
+                        if e.errno != errno.EXDEV:
+                            raise
+                        shutil.move(os.fspath(file_path), os.fspath(dest_path))
+                    # The number is only used up once the file is in place
+                    self.counters[file_type] = number
+                    moved = True
+                    self.processed_files[src_key] = None
+                    if len(self.processed_files) > MAX_PROCESSED_FILES:
+                        self.processed_files.popitem(last=False)
+                    logger.info(f"Moved {file_path.name} to {dest_path.name}")
+                except Exception as e:
+                    logger.error(f"Failed to move {file_path}: {e}")
+        
+        if moved:
+            self._save_counters()
     
     def _process_existing_files(self):
         """Process any existing files in the watch directory."""
-        for file_path in self.watch_dir.glob("*.json"):
-            self._process_file(file_path)
+        self._process_batch(sorted(self.watch_dir.glob("*.json")))
+    
+    def _drain_loop(self):
+        """Collect queued paths into batches and process them off the observer thread."""
+        while not (self._stopped.is_set() and self._pending.empty()):
+            try:
+                batch = [self._pending.get(timeout=DRAIN_INTERVAL)]
+            except queue.Empty:
+                continue
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(self._pending.get(timeout=DRAIN_INTERVAL))
+                except queue.Empty:
+                    break
+            self._process_batch(batch)
+    
+    def close(self):
+        """Process anything still queued and stop the drain thread."""
+        self._stopped.set()
+        self._drainer.join()
     
     def on_created(self, event):
         if not event.is_directory and event.src_path.endswith('.json'):
-            self._process_file(Path(event.src_path))
+            self._pending.put(Path(event.src_path))
 
 def main():
     import argparse
@@ -140,13 +295,14 @@ def main():
     try:
         logger.info(f"Watching directory: {args.watch_dir}")
         observer.start()
-        while True:
-            time.sleep(1)
+        # Block on the observer thread instead of waking up every second
+        observer.join()
     except KeyboardInterrupt:
         observer.stop()
         logger.info("Stopped watching directory")
     
     observer.join()
+    event_handler.close()
 
 if __name__ == "__main__":
     main()
@@ -9,9 +9,47 @@ agent activity to MongoDB, PostgreSQL, and MinIO.
 import os
 import sys
 import base64
-from typing import Dict, Any, List, Optional
+import time
+import asyncio
+import atexit
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime, UTC
 
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+log = logging.getLogger("cua.storage")
+
+# Content-part keys that may carry screenshot data, in lookup order
+_IMAGE_KEYS = ("image", "screenshot", "image_data", "base64")
+
+# Buffered Mongo log entries are flushed with one insert_many once this many accumulate
+LOG_BATCH_SIZE = 100
+# Joined text of a multi-part message is truncated to this many characters in its log entry
+MESSAGE_LOG_MAX_CHARS = 2000
+# Computer-call actions are logged with at most this many of their keys
+ACTION_MAX_KEYS = 8
+
+# Screenshots uploaded to MinIO at once (MinIOAdapter's HTTP pool holds 16 connections)
+UPLOAD_CONCURRENCY = int(os.getenv("SCREENSHOT_UPLOAD_CONCURRENCY", "8"))
+
+# Bounded pools for the blocking MongoDB and MinIO clients, shared across tasks
+_LOG_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cua-log")
+_UPLOAD_POOL = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix="cua-upload")
+
+# Mid-task progress rows are buffered at most once per interval (or per 10% step)
+PROGRESS_UPDATE_INTERVAL = 1.0
+PROGRESS_UPDATE_STEP = 10
+
+# Adapters created by the caches below; closed once at interpreter exit
+_OPEN_ADAPTERS: List[Any] = []
+
 # Add parent directory to path to import storage adapters
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
@@ -33,7 +71,8 @@ async def execute_task_with_storage(
     mongo_adapter: Optional[Any] = None,
     pg_adapter: Optional[Any] = None,
     minio_adapter: Optional[Any] = None,
-    agent_id: str = "cua_agent"
+    agent_id: str = "cua_agent",
+    log_level: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Execute a CUA agent task with automatic storage logging.
@@ -46,14 +85,91 @@ async def execute_task_with_storage(
         pg_adapter: Optional PostgreSQL adapter for task tracking
         minio_adapter: Optional MinIO adapter for screenshots
         agent_id: Agent identifier
+        log_level: Minimum level written to MongoDB; info-level activity logs are
+            skipped above INFO. Defaults to the CUA_LOG_LEVEL environment variable.
         
     Returns:
         Dictionary with execution results and storage info
     """
+    if log_level is None:
+        log_level = storage_log_level()
+    # Error/failure logs are always written; per-item activity logs only at INFO or below
+    log_info = bool(mongo_adapter) and log_level <= logging.INFO
     task_id = None
+    task_id_str: Optional[str] = None
+    base_meta = {"agent_id": agent_id}
+    upload_meta = base_meta | {"source": "cua_agent", "output_type": "computer_call_output"}
     screenshot_count = 0
     log_count = 0
     progress_count = 0
+    pending_logs: List[Dict[str, Any]] = []
+    pending_writes: List[asyncio.Task] = []
+    pending_progress: List[Dict[str, Any]] = []
+    iteration_count = 0
+    last_progress_ts = float("-inf")
+    last_progress_pct = -PROGRESS_UPDATE_STEP
+    loop = asyncio.get_running_loop()
+    
+    def queue_log(level: str, message: str, metadata: Dict[str, Any]) -> None:
+        if mongo_adapter and (log_info or level != "info"):
+            pending_logs.append({
+                "level": level,
+                "message": message,
+                "task_id": task_id_str,
+                "metadata": metadata,
+                "created_at": datetime.now(UTC)
+            })
+    
+    async def write_batch(batch: List[Dict[str, Any]]) -> None:
+        nonlocal log_count
+        try:
+            await loop.run_in_executor(_LOG_POOL, mongo_adapter.write_logs, batch)
+            log_count += len(batch)
+        except Exception as e:
+            log.warning("Failed to write %d logs to MongoDB: %s", len(batch), e)
+    
+    async def upload_screenshot(screenshot_data: bytes) -> None:
+        nonlocal screenshot_count
+        try:
+            object_path = await loop.run_in_executor(_UPLOAD_POOL, functools.partial(
+                minio_adapter.upload_screenshot,
+                file_data=screenshot_data,
+                task_id=task_id,
+                metadata=upload_meta
+            ))
+            screenshot_count += 1
+            
+            # Log screenshot upload
+            queue_log("info", f"Screenshot uploaded: {object_path}", base_meta | {"screenshot_path": object_path})
+        except Exception as e:
+            log.warning("Failed to store screenshot: %s", e)
+    
+    def flush_logs() -> None:
+        if not pending_logs:
+            return
+        batch = pending_logs[:]
+        pending_logs.clear()
+        pending_writes.append(asyncio.create_task(write_batch(batch)))
+    
+    async def drain_writes() -> None:
+        # Uploads queue their own log entries, so wait for them before the last flush
+        while pending_writes:
+            batch = pending_writes[:]
+            pending_writes.clear()
+            await asyncio.gather(*batch, return_exceptions=True)
+            flush_logs()
+    
+    async def flush_progress() -> None:
+        nonlocal progress_count
+        # Write buffered progress rows in one multi-row INSERT
+        if not pending_progress:
+            return
+        batch = pending_progress[:]
+        pending_progress.clear()
+        try:
+            progress_count += await asyncio.to_thread(pg_adapter.add_progress_updates, batch)
+        except Exception as e:
+            log.warning("Failed to update progress: %s", e)
     
     # Create task record in PostgreSQL if adapter available
     if pg_adapter:
@@ -65,16 +181,10 @@ async def execute_task_with_storage(
                 status="in_progress",
                 metadata={"source": "cua_agent", "task_type": "cua_execution"}
             )
-            if mongo_adapter:
-                mongo_adapter.write_log(
-                    level="info",
-                    message=f"Started task: {task_text}",
-                    task_id=str(task_id),
-                    metadata={"agent_id": agent_id, "task_text": task_text}
-                )
-                log_count += 1
+            task_id_str = str(task_id) if task_id else None
+            queue_log("info", f"Started task: {task_text}", base_meta | {"task_text": task_text})
         except Exception as e:
-            print(f"Warning: Failed to create task in PostgreSQL: {e}")
+            log.warning("Failed to create task in PostgreSQL: %s", e)
     
     # Add user message to history
     history.append({"role": "user", "content": task_text})
@@ -89,95 +199,73 @@ async def execute_task_with_storage(
                 item_type = item.get("type", "")
                 
                 # Log messages to MongoDB
-                if item_type == "message" and mongo_adapter:
+                if item_type == "message" and log_info:
                     try:
-                        content_parts = item.get("content", [])
-                        for content_part in content_parts:
-                            if content_part.get("text"):
-                                mongo_adapter.write_log(
-                                    level="info",
-                                    message=content_part.get("text", "")[:500],
-                                    task_id=str(task_id) if task_id else None,
-                                    metadata={
-                                        "agent_id": agent_id,
-                                        "output_type": "message",
-                                        "role": item.get("role", "assistant")
-                                    }
-                                )
-                                log_count += 1
+                        # One log entry per message, however many text parts it has
+                        texts = [
+                            part["text"][:500] for part in item.get("content", [])
+                            if isinstance(part, dict) and isinstance(part.get("text"), str) and part["text"]
+                        ]
+                        if texts:
+                            queue_log("info", "\n".join(texts)[:MESSAGE_LOG_MAX_CHARS], base_meta | {
+                                "output_type": "message",
+                                "role": item.get("role", "assistant"),
+                                "n_parts": len(texts)
+                            })
                     except Exception as e:
-                        print(f"Warning: Failed to log message to MongoDB: {e}")
+                        log.warning("Failed to log message to MongoDB: %s", e)
                 
                 # Log computer calls
-                elif item_type == "computer_call" and mongo_adapter:
+                elif item_type == "computer_call" and log_info:
                     try:
                         action = item.get("action", {})
                         action_type = action.get("type", "")
-                        mongo_adapter.write_log(
-                            level="info",
-                            message=f"Computer action: {action_type}",
-                            task_id=str(task_id) if task_id else None,
-                            metadata={
-                                "agent_id": agent_id,
-                                "output_type": "computer_call",
-                                "action": action_type,
-                                "action_details": str(action)[:200]
-                            }
-                        )
-                        log_count += 1
+                        queue_log("info", f"Computer action: {action_type}", base_meta | {
+                            "output_type": "computer_call",
+                            # Stored as a subdocument so metadata.action.type is indexable
+                            "action": {k: action[k] for k in list(action)[:ACTION_MAX_KEYS]}
+                        })
                     except Exception as e:
-                        print(f"Warning: Failed to log computer call: {e}")
+                        log.warning("Failed to log computer call: %s", e)
                 
                 # Extract and store screenshots
                 elif item_type == "computer_call_output" and minio_adapter:
                     try:
-                        screenshots = _extract_images_from_output([item])
-                        for screenshot_data in screenshots:
-                            if screenshot_data:
-                                object_path = minio_adapter.upload_screenshot(
-                                    file_data=screenshot_data,
-                                    task_id=task_id,
-                                    metadata={
-                                        "agent_id": agent_id,
-                                        "source": "cua_agent",
-                                        "output_type": "computer_call_output"
-                                    }
-                                )
-                                screenshot_count += 1
-                                
-                                # Log screenshot upload
-                                if mongo_adapter:
-                                    mongo_adapter.write_log(
-                                        level="info",
-                                        message=f"Screenshot uploaded: {object_path}",
-                                        task_id=str(task_id) if task_id else None,
-                                        metadata={
-                                            "agent_id": agent_id,
-                                            "screenshot_path": object_path
-                                        }
-                                    )
-                                    log_count += 1
+                        for screenshot_data in _iter_images([item]):
+                            pending_writes.append(asyncio.create_task(upload_screenshot(screenshot_data)))
                     except Exception as e:
-                        print(f"Warning: Failed to store screenshot: {e}")
+                        log.warning("Failed to store screenshot: %s", e)
                 
                 # Add to history
                 history.append(item)
             
-            # Update progress in PostgreSQL
+            if len(pending_logs) >= LOG_BATCH_SIZE:
+                flush_logs()
+            
+            # Buffer progress for PostgreSQL, throttled by time and percent advance
             if pg_adapter and task_id:
-                try:
-                    # Calculate progress (rough estimate based on output items)
-                    progress_percent = min(90, progress_count * 10)  # Rough estimate
-                    progress_id = pg_adapter.add_progress_update(
-                        task_id=task_id,
-                        agent_id=agent_id,
-                        progress_percent=progress_percent,
-                        message=f"Processed {len(output_items)} output items",
-                        data={"output_items_count": len(output_items)}
-                    )
-                    progress_count += 1
-                except Exception as e:
-                    print(f"Warning: Failed to update progress: {e}")
+                # Calculate progress (rough estimate based on iterations)
+                progress_percent = min(90, iteration_count * 10)  # Rough estimate
+                now = time.monotonic()
+                if (now - last_progress_ts >= PROGRESS_UPDATE_INTERVAL
+                        or progress_percent - last_progress_pct >= PROGRESS_UPDATE_STEP):
+                    pending_progress.append({
+                        "task_id": task_id,
+                        "agent_id": agent_id,
+                        "progress_percent": progress_percent,
+                        "message": f"Processed {len(output_items)} output items",
+                        "data": {"output_items_count": len(output_items)},
+                        # Naive UTC, like the adapter's own default for this column
+                        "timestamp": datetime.utcnow()
+                    })
+                    last_progress_ts = now
+                    last_progress_pct = progress_percent
+            iteration_count += 1
+        
+        # Let in-flight uploads and log writes land before reporting completion
+        await drain_writes()
+        
+        await flush_progress()
         
         # Mark task as completed
         if pg_adapter and task_id:
@@ -185,7 +273,7 @@ async def execute_task_with_storage(
                 pg_adapter.update_task_status(
                     task_id=task_id,
                     status="completed",
-                    metadata={"completed_at": datetime.now(UTC).isoformat()}
+                    metadata={"completed_at": datetime.utcnow().isoformat()}
                 )
                 
                 # Final progress update
@@ -198,32 +286,27 @@ async def execute_task_with_storage(
                 )
                 progress_count += 1
                 
-                if mongo_adapter:
-                    mongo_adapter.write_log(
-                        level="info",
-                        message=f"Task completed: {task_text}",
-                        task_id=str(task_id),
-                        metadata={"agent_id": agent_id, "status": "completed"}
-                    )
-                    log_count += 1
+                queue_log("info", f"Task completed: {task_text}", base_meta | {"status": "completed"})
             except Exception as e:
-                print(f"Warning: Failed to mark task as completed: {e}")
+                log.warning("Failed to mark task as completed: %s", e)
+        
+        flush_logs()
+        await drain_writes()
     
     except Exception as e:
+        # A failed task keeps the progress history it made before the error
+        await flush_progress()
+        
         # Mark task as failed
         if pg_adapter and task_id:
             try:
                 pg_adapter.update_task_status(task_id, "failed")
-                if mongo_adapter:
-                    mongo_adapter.write_log(
-                        level="error",
-                        message=f"Task failed: {str(e)}",
-                        task_id=str(task_id),
-                        metadata={"agent_id": agent_id, "error": str(e)}
-                    )
-                    log_count += 1
+                queue_log("error", f"Task failed: {str(e)}", base_meta | {"error": str(e)})
             except:
                 pass
+        # Failure logs still land, along with anything buffered before the error
+        flush_logs()
+        await drain_writes()
         raise
     
     return {
@@ -235,6 +318,51 @@ async def execute_task_with_storage(
     }
 
 
+def _decode_image(data: Any) -> Optional[bytes]:
+    """Decode a base64 string (optionally a data URL) or pass raw bytes through."""
+    if isinstance(data, bytes):
+        return data
+    if not isinstance(data, str) or not data:
+        return None
+    # Skip a data URL prefix without splitting off a copy of the prefix
+    comma = data.find(",")
+    payload = data if comma < 0 else data[comma + 1:]
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64decode(payload, validate=False)
+    return base64.b64decode(payload)
+
+
+def _iter_images(output_items: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Yield decoded images from agent output items one at a time.
+    
+    Args:
+        output_items: List of output items from agent
+        
+    Yields:
+        Image bytes, so callers can upload and release each screenshot in turn
+    """
+    for item in output_items:
+        if item.get("type") != "computer_call_output":
+            continue
+        for content_part in item.get("content", []):
+            if not isinstance(content_part, dict):
+                continue
+            if content_part.get("type") != "image" and not ("screenshot" in content_part or "image" in content_part):
+                continue
+            for key in _IMAGE_KEYS:
+                data = content_part.get(key)
+                if not data:
+                    continue
+                try:
+                    image_bytes = _decode_image(data)
+                except Exception as e:
+                    log.warning("Failed to decode image: %s", e)
+                    continue
+                if image_bytes:
+                    yield image_bytes
+
+
 def _extract_images_from_output(output_items: List[Dict[str, Any]]) -> List[bytes]:
     """
     Extract base64-encoded images from agent output items.
@@ -245,45 +373,35 @@ def _extract_images_from_output(output_items: List[Dict[str, Any]]) -> List[byte
     Returns:
         List of image bytes
     """
-    images = []
+    return list(_iter_images(output_items))
+
+
+@functools.lru_cache(maxsize=8)
+def _get_pg_adapter(pg_url: str) -> Any:
+    """
+    Return the process-wide PostgresAdapter for a connection string.
     
-    for item in output_items:
-        if item.get("type") == "computer_call_output":
-            content = item.get("content", [])
-            for content_part in content:
-                if isinstance(content_part, dict):
-                    # Check for base64 image data
-                    if content_part.get("type") == "image":
-                        image_data = content_part.get("image")
-                        if image_data:
-                            # Could be base64 string or already bytes
-                            try:
-                                if isinstance(image_data, str):
-                                    # Remove data URL prefix if present
-                                    if "," in image_data:
-                                        image_data = image_data.split(",", 1)[1]
-                                    image_bytes = base64.b64decode(image_data)
-                                    images.append(image_bytes)
-                                elif isinstance(image_data, bytes):
-                                    images.append(image_data)
-                            except Exception as e:
-                                print(f"Warning: Failed to decode image: {e}")
-                    # Also check for screenshot_path or similar
-                    elif "screenshot" in content_part or "image" in content_part:
-                        # Try to extract base64 if present
-                        for key in ["screenshot", "image", "image_data", "base64"]:
-                            if key in content_part:
-                                try:
-                                    data = content_part[key]
-                                    if isinstance(data, str) and "," in data:
-                                        data = data.split(",", 1)[1]
-                                    if isinstance(data, str):
-                                        image_bytes = base64.b64decode(data)
-                                        images.append(image_bytes)
-                                except:
-                                    pass
+    Each adapter owns a pooled SQLAlchemy engine, so sharing it keeps
+    connections warm instead of paying the connect/auth handshake per call.
+    Failed constructions raise and are therefore not cached.
+    """
+    adapter = PostgresAdapter(connection_string=pg_url)
+    _OPEN_ADAPTERS.append(adapter)
+    return adapter
+
+
+def storage_log_level() -> int:
+    """
+    Read the MongoDB logging threshold from CUA_LOG_LEVEL (a level name or number).
     
-    return images
+    Returns:
+        Logging level, INFO when unset or unrecognized
+    """
+    value = os.getenv("CUA_LOG_LEVEL", "INFO").strip()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    return level if isinstance(level, int) else logging.INFO
 
 
 def initialize_storage_adapters(agent_id: str = "cua_agent") -> Dict[str, Any]:
@@ -309,18 +427,18 @@ def initialize_storage_adapters(agent_id: str = "cua_agent") -> Dict[str, Any]:
         else:
             adapters["mongo"] = None
     except Exception as e:
-        print(f"Warning: Failed to initialize MongoDB adapter: {e}")
+        log.warning("Failed to initialize MongoDB adapter: %s", e)
         adapters["mongo"] = None
     
     # PostgreSQL adapter
     try:
         pg_url = os.getenv("POSTGRES_URL")
         if pg_url:
-            adapters["pg"] = PostgresAdapter(connection_string=pg_url)
+            adapters["pg"] = _get_pg_adapter(pg_url)
         else:
             adapters["pg"] = None
     except Exception as e:
-        print(f"Warning: Failed to initialize PostgreSQL adapter: {e}")
+        log.warning("Failed to initialize PostgreSQL adapter: %s", e)
         adapters["pg"] = None
     
     # MinIO adapter (requires PostgreSQL for metadata)
@@ -335,12 +453,39 @@ def initialize_storage_adapters(agent_id: str = "cua_agent") -> Dict[str, Any]:
         else:
             adapters["minio"] = None
     except Exception as e:
-        print(f"Warning: Failed to initialize MinIO adapter: {e}")
+        log.warning("Failed to initialize MinIO adapter: %s", e)
         adapters["minio"] = None
     
     return adapters
 
 
+@functools.lru_cache(maxsize=8)
+def _cached_storage_adapters(agent_id: str, env_key: tuple) -> Dict[str, Any]:
+    # env_key only keys the cache, so changed connection settings get fresh adapters
+    adapters = initialize_storage_adapters(agent_id=agent_id)
+    _OPEN_ADAPTERS.extend(a for a in adapters.values() if a)
+    return adapters
+
+
+def _storage_env_key() -> tuple:
+    return tuple(os.getenv(name) for name in ("MONGODB_URL", "POSTGRES_URL", "MINIO_ENDPOINT"))
+
+
+@atexit.register
+def _close_adapters() -> None:
+    """Close every cached adapter (each shared adapter once) at interpreter exit."""
+    seen = set()
+    for adapter in _OPEN_ADAPTERS:
+        if id(adapter) in seen or not hasattr(adapter, "close"):
+            continue
+        seen.add(id(adapter))
+        try:
+            adapter.close()
+        except Exception as e:
+            log.warning("Failed to close %s: %s", type(adapter).__name__, e)
+    _OPEN_ADAPTERS.clear()
+
+
 def store_task(task_content: str, agent_id: str = "task_runner") -> Optional[int]:
     """
     Store a task from run_task.py into the database.
@@ -356,8 +501,8 @@ def store_task(task_content: str, agent_id: str = "task_runner") -> Optional[int
         return None
     
     try:
-        # Initialize storage adapters
-        adapters = initialize_storage_adapters(agent_id=agent_id)
+        # Initialize storage adapters (reused across calls in this process)
+        adapters = _cached_storage_adapters(agent_id, _storage_env_key())
         pg_adapter = adapters.get("pg")
         mongo_adapter = adapters.get("mongo")
         
@@ -374,7 +519,7 @@ def store_task(task_content: str, agent_id: str = "task_runner") -> Optional[int
         )
         
         # Log to MongoDB if available
-        if mongo_adapter:
+        if mongo_adapter and storage_log_level() <= logging.INFO:
             try:
                 mongo_adapter.write_log(
                     level="info",
@@ -383,10 +528,10 @@ def store_task(task_content: str, agent_id: str = "task_runner") -> Optional[int
                     metadata={"agent_id": agent_id, "task_text": task_content, "source": "run_task.py"}
                 )
             except Exception as e:
-                print(f"Warning: Failed to log to MongoDB: {e}")
+                log.warning("Failed to log to MongoDB: %s", e)
         
         return task_id
     except Exception as e:
-        print(f"Warning: Failed to store task in database: {e}")
+        log.warning("Failed to store task in database: %s", e)
         return None
 
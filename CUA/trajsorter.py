@@ -0,0 +1,348 @@
+"""
+Trajectory Sorter
+=================
+
+Classifies trajectory JSON logs into screenshots, agent responses and other.
+Shared by the traj-sorter.py entry point and any other copy of the tool.
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Optional, Any
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+__all__ = [
+    "collect_json_files",
+    "classify_files",
+    "copy_grouped",
+    "is_screenshot_like",
+    "is_agent_response",
+    "extract_agent_response_text",
+    "main",
+]
+
+# Files larger than this are stream-parsed (when ijson is available) instead of fully loaded
+STREAM_PARSE_MIN_BYTES = 1_000_000
+# Below this many files the process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
+PARALLEL_CHUNKSIZE = 64
+COPY_WORKERS = 8
+
+_STREAM_ITEM_PREFIXES = ("output.item", "response.output.item")
+_STREAM_TYPE_PREFIXES = ("output.item.type", "response.output.item.type")
+_STREAM_CONTENT_PREFIXES = ("output.item.content.item", "response.output.item.content.item")
+
+# Filename hints, checked in this order (screenshot hints win over agent hints)
+_SCREENSHOT_NAME_RE = re.compile(r"screenshot|computer_call_result|annotated")
+_AGENT_NAME_RE = re.compile(r"agent[_-]response")
+_SS_KEYS = frozenset({"screenshot", "image", "image_path", "screenshot_path"})
+_SS_OUTPUT_TYPES = frozenset({"computer_call_output", "computer_call"})
+
+
+@functools.lru_cache(maxsize=4096)
+def _lower_name(filename: str) -> str:
+    return filename.lower()
+
+
+def _iter_message_contents(data: Dict[str, Any]) -> Iterator[List[Any]]:
+    """Yield non-empty content lists of message items under response.output and output."""
+    response = data.get("response")
+    for root in (response, data):
+        if not isinstance(root, dict):
+            continue
+        output = root.get("output")
+        if not isinstance(output, list):
+            continue
+        for item in output:
+            if isinstance(item, dict) and item.get("type") == "message":
+                content = item.get("content")
+                if isinstance(content, list) and content:
+                    yield content
+
+
+def _validate_agent_response_schema(data: Dict[str, Any]) -> bool:
+    """Validate that data matches expected agent response schema."""
+    if not isinstance(data, dict):
+        return False
+    
+    # Schemas 1 and 2: response.output / output message structures
+    if next(_iter_message_contents(data), None) is not None:
+        return True
+    
+    # Schema 3: role-based messages
+    return data.get("role") == "assistant"
+
+
+def is_agent_response(filename: str, data: Dict) -> bool:
+    """Check if a file is an agent response with schema validation."""
+    if not isinstance(filename, str) or not isinstance(data, dict):
+        return False
+    
+    if _AGENT_NAME_RE.search(_lower_name(filename)):
+        return True
+    
+    return _validate_agent_response_schema(data)
+
+
+def extract_agent_response_text(data: Dict[str, Any]) -> Optional[str]:
+    """Extract text content from an agent response JSON with schema validation."""
+    if not isinstance(data, dict):
+        return None
+    
+    for content in _iter_message_contents(data):
+        for content_item in content:
+            if isinstance(content_item, dict) and content_item.get("type") == "output_text":
+                text = content_item.get("text")
+                if isinstance(text, str) and text:
+                    return text
+    
+    return None
+
+
+def is_screenshot_like(filename: str, data: Dict) -> bool:
+    # File-name hints
+    if _SCREENSHOT_NAME_RE.search(_lower_name(filename)):
+        return True
+    # Content hints
+    if isinstance(data, dict):
+        # Look for entries that indicate a screenshot/computer output event
+        output = data.get("output")
+        if isinstance(output, list):
+            for item in output:
+                if isinstance(item, dict) and item.get("type") in _SS_OUTPUT_TYPES:
+                    return True
+        if not _SS_KEYS.isdisjoint(data.keys()):
+            return True
+    return False
+
+
+def _load_json(fp: Path) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(fp.read_bytes())
+    with fp.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _classify_stream(fp: Path, is_agent: bool = False) -> str:
+    """Classify a large file from parse events, without building its content trees."""
+    in_message = has_content = False
+    with fp.open("rb") as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == "output.item.type" and value in _SS_OUTPUT_TYPES:
+                # Screenshot hints win over agent hints, so stop at the first one
+                return "screenshots"
+            if prefix == "" and event == "map_key" and value in _SS_KEYS:
+                return "screenshots"
+            if is_agent:
+                continue
+            if prefix in _STREAM_ITEM_PREFIXES:
+                if event == "start_map":
+                    in_message = has_content = False
+                elif event == "end_map" and in_message and has_content:
+                    is_agent = True
+            elif prefix in _STREAM_TYPE_PREFIXES:
+                in_message = value == "message"
+            elif prefix in _STREAM_CONTENT_PREFIXES:
+                # Any event at the content item level means the content list is non-empty
+                has_content = True
+            elif prefix == "role" and value == "assistant":
+                is_agent = True
+    return "agent_responses" if is_agent else "other"
+
+
+def collect_json_files(root: Path) -> List[Path]:
+    # scandir's DirEntry caches the file type, so each entry costs no extra stat()
+    out: List[Path] = []
+    stack = [os.fspath(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".json") and entry.is_file(follow_symlinks=False):
+                    out.append(Path(entry.path))
+    return out
+
+
+def _classify_one(fp: Path) -> str:
+    """Return the bucket ("screenshots", "agent_responses" or "other") for one file."""
+    # A screenshot name settles it without a parse; an agent-response name still loses to
+    # screenshot content, so those files are parsed like any other
+    name = _lower_name(fp.name)
+    if _SCREENSHOT_NAME_RE.search(name):
+        return "screenshots"
+    agent_named = _AGENT_NAME_RE.search(name) is not None
+
+    try:
+        size = fp.stat().st_size
+        if size == 0:
+            # Empty files can't hold JSON; skip the open and parse
+            return "other"
+        if IJSON_AVAILABLE and size > STREAM_PARSE_MIN_BYTES:
+            return _classify_stream(fp, agent_named)
+        data = _load_json(fp)
+    except Exception:
+        # If unreadable, treat as other
+        return "other"
+
+    if is_screenshot_like(fp.name, data):
+        return "screenshots"
+    if is_agent_response(fp.name, data):
+        return "agent_responses"
+    return "other"
+
+
+def classify_files(files: List[Path]) -> Tuple[List[Path], List[Path], List[Path]]:
+    groups: Dict[str, List[Path]] = {"screenshots": [], "agent_responses": [], "other": []}
+
+    if len(files) < PARALLEL_MIN_FILES:
+        for fp in files:
+            groups[_classify_one(fp)].append(fp)
+    else:
+        # JSON parsing is CPU-bound, so spread files across processes rather than threads
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+            for fp, bucket in zip(files, ex.map(_classify_one, files, chunksize=PARALLEL_CHUNKSIZE)):
+                groups[bucket].append(fp)
+
+    return groups["screenshots"], groups["agent_responses"], groups["other"]
+
+
+def _copy_file(src: Path, dst: Path, link: bool = True) -> None:
+    """Hardlink src to dst when allowed, else copy it in-kernel, else fall back to copy2."""
+    # Never write through an existing dst: it may be a hardlink to src from an earlier run
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                remaining = os.fstat(s.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def copy_grouped(
+    screenshots: List[Path],
+    agent_responses: List[Path],
+    other: List[Path],
+    dest_root: Path,
+    link: bool = True,
+) -> None:
+    jobs: List[Tuple[Path, Path]] = []
+    for group_name, group in (
+        ("screenshots", screenshots),
+        ("agent_responses", agent_responses),
+        ("other", other),
+    ):
+        out_dir = dest_root / group_name
+        out_dir.mkdir(parents=True, exist_ok=True)
+        seen: set = set()
+        for src in group:
+            # Recreate partial directory structure for clarity
+            relative = src.parent.name + "_" + src.name
+            src_stat = src.stat()
+            if relative in seen:
+                # Same parent dir name and filename from another session; keep both
+                relative = f"{src.parent.name}_{src_stat.st_ino:x}_{src.name}"
+            seen.add(relative)
+            dst = out_dir / relative
+            try:
+                dst_stat = dst.stat()
+            except FileNotFoundError:
+                dst_stat = None
+            if (dst_stat is not None and dst_stat.st_size == src_stat.st_size
+                    and int(dst_stat.st_mtime) == int(src_stat.st_mtime)):
+                # Already copied (or linked) on an earlier run
+                continue
+            jobs.append((src, dst))
+
+    # Copies spend their time in syscalls that release the GIL, so threads overlap them
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as ex:
+        for _ in ex.map(lambda job: _copy_file(job[0], job[1], link), jobs):
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Classify trajectory JSON logs into screenshots, agent_responses, other")
+    parser.add_argument(
+        "--root",
+        default=str(Path(__file__).parent / "trajectories"),
+        help="Root trajectories directory (default: ./trajectories)",
+    )
+    parser.add_argument(
+        "--copy-to",
+        default=None,
+        help="If set, copy grouped files into this directory (creates screenshots/ agent_responses/ other/)",
+    )
+    parser.add_argument(
+        "--no-link",
+        action="store_true",
+        help="Always write real copies instead of hardlinking when source and destination share a filesystem",
+    )
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    if not root.exists():
+        print(f"Root not found: {root}")
+        return
+
+    files = collect_json_files(root)
+    screenshots, agent_responses, other = classify_files(files)
+
+    print("\n=== Classification Summary ===")
+    print(f"Screenshots-like JSON: {len(screenshots)}")
+    print(f"Agent responses:       {len(agent_responses)}")
+    print(f"Other:                 {len(other)}\n")
+
+    def preview(label: str, paths: List[Path]) -> None:
+        print(f"{label} (showing up to 10):")
+        for p in paths[:10]:
+            print(f" - {p}")
+        if len(paths) > 10:
+            print(f" ... (+{len(paths) - 10} more)")
+        print()
+
+    preview("Screenshots-like", screenshots)
+    preview("Agent responses", agent_responses)
+    preview("Other", other)
+
+    if args.copy_to:
+        dest_root = Path(args.copy_to)
+        dest_root.mkdir(parents=True, exist_ok=True)
+        copy_grouped(screenshots, agent_responses, other, dest_root, link=not args.no_link)
+        print(f"Copied grouped files into: {dest_root}")
+
+
+if __name__ == "__main__":
+    main()
+
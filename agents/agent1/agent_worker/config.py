@@ -23,6 +23,15 @@ class Config:
     poll_interval_seconds: int
     run_task_timeout_seconds: int
     
+    # Seconds between heartbeats for a running task
+    heartbeat_interval_seconds: int = 15
+    
+    # Run tasks in one long-lived execute_task.py process instead of one process per task
+    persistent_task_worker: bool = False
+    
+    # CPU that execute_task.py processes are pinned to (None leaves them unpinned)
+    agent_cpu: Optional[int] = None
+    
     @classmethod
     def from_env(cls) -> "Config":
         """Load configuration from environment variables."""
@@ -44,12 +53,18 @@ class Config:
         # Worker settings with defaults
         poll_interval_seconds = int(os.getenv("POLL_INTERVAL_SECONDS", "5"))
         run_task_timeout_seconds = int(os.getenv("RUN_TASK_TIMEOUT_SECONDS", "300"))
+        heartbeat_interval_seconds = int(os.getenv("HEARTBEAT_INTERVAL_SECONDS", "15"))
+        persistent_task_worker = os.getenv("PERSISTENT_TASK_WORKER", "false").lower() in ("1", "true", "yes")
+        agent_cpu = int(os.getenv("AGENT_CPU")) if os.getenv("AGENT_CPU") else None
         
         return cls(
             postgres_dsn=postgres_dsn,
             mongo_uri=mongo_uri,
             agent_id=agent_id,
             poll_interval_seconds=poll_interval_seconds,
-            run_task_timeout_seconds=run_task_timeout_seconds
+            run_task_timeout_seconds=run_task_timeout_seconds,
+            heartbeat_interval_seconds=heartbeat_interval_seconds,
+            persistent_task_worker=persistent_task_worker,
+            agent_cpu=agent_cpu
         )
 
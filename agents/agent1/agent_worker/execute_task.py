@@ -7,10 +7,13 @@ Usage:
     python execute_task.py "task description"
     or
     TASK_DESCRIPTION="task description" python execute_task.py
+    or
+    python execute_task.py --server   (persistent worker driven by runner.py)
 """
 
 import sys
 import os
+import json
 import asyncio
 import logging
 from pathlib import Path
@@ -122,6 +125,8 @@ async def execute_task_async(task_description: str, task_id: Optional[int] = Non
         "output": "",
         "error": None
     }
+    trajectory_observer = None
+    computer = None
     
     # Run diagnostics first
     print("\n=== CUA Package Diagnostics ===")
@@ -378,6 +383,23 @@ async def execute_task_async(task_description: str, task_id: Optional[int] = Non
         import traceback
         traceback.print_exc()
     
+    # A persistent worker runs many tasks; release this task's sandbox connection
+    # and watcher, and let its screenshot uploads land before the result is reported
+    if computer is not None:
+        close = getattr(computer, "disconnect", None) or getattr(computer, "stop", None)
+        if close is not None:
+            try:
+                closing = close()
+                if asyncio.iscoroutine(closing):
+                    await closing
+            except Exception as e:
+                print(f"Warning: Failed to close Computer instance: {e}")
+    
+    if trajectory_observer is not None:
+        trajectory_observer.stop()
+        trajectory_observer.join(timeout=5)
+        trajectory_observer.processor.wait_for_uploads()
+    
     return result
 
 
@@ -398,8 +420,131 @@ def execute_task(task_description: str, task_id: Optional[int] = None, mongo_cli
     return asyncio.run(execute_task_async(task_description, task_id, mongo_client))
 
 
+def mongo_client_from_env() -> Optional[Any]:
+    """Create a MongoDB client from MONGO_URI/AGENT_ID, or return None if unset or unreachable."""
+    mongo_uri = os.getenv("MONGO_URI")
+    agent_id = os.getenv("AGENT_ID")
+    if mongo_uri and agent_id:
+        try:
+            from db_adapters import MongoClientWrapper
+            return MongoClientWrapper(mongo_uri, agent_id)
+        except Exception as e:
+            print(f"Warning: Failed to initialize MongoDB client: {e}")
+    return None
+
+
+def run_single_task(task_description: str, task_id: Optional[int] = None, mongo_client: Optional[Any] = None) -> int:
+    """
+    Execute one task and print the result block runner.py extracts the response from.
+    
+    Args:
+        task_description: The task description to execute
+        task_id: Optional task identifier
+        mongo_client: Optional MongoDB client for the trajectory processor
+        
+    Returns:
+        Exit code (0 on success, 1 on error)
+    """
+    print("=" * 60)
+    print("AGENT WORKER TASK EXECUTOR")
+    print("=" * 60)
+    print()
+    
+    result = execute_task(task_description, task_id=task_id, mongo_client=mongo_client)
+    
+    print()
+    print("=" * 60)
+    print("EXECUTION RESULT")
+    print("=" * 60)
+    print(f"Status: {result['status']}")
+    if result.get('output'):
+        print(f"Output:\n{result['output']}")
+    if result.get('error'):
+        print(f"Error: {result['error']}")
+    
+    # Output the response in a structured format that can be easily extracted
+    # This marker helps runner.py extract just the agent response
+    print()
+    print("=" * 60)
+    print("AGENT_RESPONSE_START")
+    print("=" * 60)
+    if result['output']:
+        # Output just the agent response, not diagnostics
+        print(result['output'])
+    elif result['error']:
+        print(f"Error: {result['error']}")
+    else:
+        print("No output or error")
+    print("=" * 60)
+    print("AGENT_RESPONSE_END")
+    print("=" * 60)
+    
+    # Exit code for the caller
+    return 0 if result['status'] == 'success' else 1
+
+
+def _run_redirected(request: dict, mongo_client: Optional[Any]) -> int:
+    """Run one server-mode task with fd 1/2 pointed at the files named in the request."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_stdout, saved_stderr = os.dup(1), os.dup(2)
+    with open(request["stdout_path"], "wb") as out, open(request["stderr_path"], "wb") as err:
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        try:
+            return run_single_task(request["description"], request.get("task_id"), mongo_client)
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_stdout, 1)
+            os.dup2(saved_stderr, 2)
+            os.close(saved_stdout)
+            os.close(saved_stderr)
+
+
+def serve():
+    """
+    Persistent worker mode: run tasks sent by runner.py, one JSON line per task.
+    
+    Each request carries task_id, description, workdir, stdout_path and
+    stderr_path. The task's output goes to those files, and the reply line
+    carries the exit code a one-shot run would have returned. The interpreter,
+    the CUA imports and the MongoDB client stay warm across tasks.
+    """
+    mongo_client = mongo_client_from_env()
+    home = os.getcwd()
+    
+    # Replies go to a private copy of stdout; anything printed between tasks goes to stderr
+    replies = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+    
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        os.environ["TASK_ID"] = str(request.get("task_id", ""))
+        os.environ["TASK_DESCRIPTION"] = request["description"]
+        os.environ["WORKDIR"] = request["workdir"]
+        os.chdir(request["workdir"])
+        try:
+            return_code = _run_redirected(request, mongo_client)
+        finally:
+            os.chdir(home)
+        replies.write(json.dumps({"return_code": return_code}) + "\n")
+    
+    replies.close()
+
+
 def main():
     """Main entry point."""
+    if sys.argv[1:] == ["--server"]:
+        serve()
+        return
+    
     task_description = get_task_description()
     
     # If no task description provided, run in polling mode using runner
@@ -432,15 +577,7 @@ def main():
         return
     
     # Single task execution mode
-    print("=" * 60)
-    print("AGENT WORKER TASK EXECUTOR")
-    print("=" * 60)
-    print()
-    
-    # Get task_id and mongo_client from environment if available
     task_id = None
-    mongo_client = None
-    
     task_id_str = os.getenv("TASK_ID")
     if task_id_str:
         try:
@@ -448,49 +585,7 @@ def main():
         except:
             pass
     
-    mongo_uri = os.getenv("MONGO_URI")
-    agent_id = os.getenv("AGENT_ID")
-    if mongo_uri and agent_id:
-        try:
-            from db_adapters import MongoClientWrapper
-            mongo_client = MongoClientWrapper(mongo_uri, agent_id)
-        except Exception as e:
-            print(f"Warning: Failed to initialize MongoDB client: {e}")
-    
-    result = execute_task(task_description, task_id=task_id, mongo_client=mongo_client)
-    
-    print()
-    print("=" * 60)
-    print("EXECUTION RESULT")
-    print("=" * 60)
-    print(f"Status: {result['status']}")
-    if result.get('output'):
-        print(f"Output:\n{result['output']}")
-    if result.get('error'):
-        print(f"Error: {result['error']}")
-    
-    # Output the response in a structured format that can be easily extracted
-    # This marker helps runner.py extract just the agent response
-    print()
-    print("=" * 60)
-    print("AGENT_RESPONSE_START")
-    print("=" * 60)
-    if result['output']:
-        # Output just the agent response, not diagnostics
-        print(result['output'])
-    elif result['error']:
-        print(f"Error: {result['error']}")
-    else:
-        print("No output or error")
-    print("=" * 60)
-    print("AGENT_RESPONSE_END")
-    print("=" * 60)
-    
-    # Exit with appropriate code
-    if result['status'] == 'success':
-        sys.exit(0)
-    else:
-        sys.exit(1)
+    sys.exit(run_single_task(task_description, task_id=task_id, mongo_client=mongo_client_from_env()))
 
 
 if __name__ == "__main__":
@@ -10,6 +10,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 from storage import MongoAdapter, PostgresAdapter
 
+# Resource metrics scraped from log messages, compiled once rather than per collection
+_MEM_RE = re.compile(r"mem(ory)?[:=\s]+([0-9.]+)\s*mb", re.I)
+_CPU_RE = re.compile(r"cpu[:=\s]+([0-9.]+)\s*%", re.I)
+# Match common cost patterns e.g. cost: 0.0123, total_cost=$0.05, usd_cost=0.01
+_COST_RE = re.compile(r"(total_)?(usd_)?cost\s*[:=\s$]+([0-9]+(?:\.[0-9]+)?)", re.I)
+
 
 class DataCollector:
     """Collects and normalizes data across Mongo and Postgres."""
@@ -40,25 +46,21 @@ class DataCollector:
         mem_usage = 0.0
         cpu_usage = 0.0
         cost_usd = 0.0
-        mem_re = re.compile(r"mem(ory)?[:=\s]+([0-9.]+)\s*mb", re.I)
-        cpu_re = re.compile(r"cpu[:=\s]+([0-9.]+)\s*%", re.I)
-        # Match common cost patterns e.g. cost: 0.0123, total_cost=$0.05, usd_cost=0.01
-        cost_re = re.compile(r"(total_)?(usd_)?cost\s*[:=\s$]+([0-9]+(?:\.[0-9]+)?)", re.I)
         for l in logs:
             msg = l.get("message") or ""
-            m1 = mem_re.search(msg)
+            m1 = _MEM_RE.search(msg)
             if m1:
                 try:
                     mem_usage = max(mem_usage, float(m1.group(2)))
                 except Exception:
                     pass
-            m2 = cpu_re.search(msg)
+            m2 = _CPU_RE.search(msg)
             if m2:
                 try:
                     cpu_usage = max(cpu_usage, float(m2.group(1)))
                 except Exception:
                     pass
-            mc = cost_re.search(msg)
+            mc = _COST_RE.search(msg)
             if mc:
                 try:
                     cost_usd = max(cost_usd, float(mc.group(3)))
@@ -147,24 +149,21 @@ class DataCollector:
             mem_usage = 0.0
             cpu_usage = 0.0
             cost_usd = 0.0
-            mem_re = re.compile(r"mem(ory)?[:=\s]+([0-9.]+)\s*mb", re.I)
-            cpu_re = re.compile(r"cpu[:=\s]+([0-9.]+)\s*%", re.I)
-            cost_re = re.compile(r"(total_)?(usd_)?cost\s*[:=\s$]+([0-9]+(?:\.[0-9]+)?)", re.I)
             for l in logs:
                 msg = l.get("message") or ""
-                m1 = mem_re.search(msg)
+                m1 = _MEM_RE.search(msg)
                 if m1:
                     try:
                         mem_usage = max(mem_usage, float(m1.group(2)))
                     except Exception:
                         pass
-                m2 = cpu_re.search(msg)
+                m2 = _CPU_RE.search(msg)
                 if m2:
                     try:
                         cpu_usage = max(cpu_usage, float(m2.group(1)))
                     except Exception:
                         pass
-                mc = cost_re.search(msg)
+                mc = _COST_RE.search(msg)
                 if mc:
                     try:
                         cost_usd = max(cost_usd, float(mc.group(3)))
@@ -1,14 +1,22 @@
 """
 Lean trajectory processor - watches CUA trajectory files and stores in MongoDB.
 """
+import os
 import json
 import base64
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
 # Import db_adapters - try absolute first (for direct execution), then relative (for package import)
 try:
     from db_adapters import MongoClientWrapper
@@ -24,6 +32,33 @@ except ImportError:
             sys.path.insert(0, str(current_dir))
         from db_adapters import MongoClientWrapper
 
+# Screenshots are stored concurrently; each processor waits for its own uploads
+# in wait_for_uploads() before its task is reported finished
+UPLOAD_CONCURRENCY = int(os.getenv("SCREENSHOT_UPLOAD_CONCURRENCY", "8"))
+_UPLOAD_POOL = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix="screenshot-upload")
+
+
+def _scan_json_files(root: str) -> List[str]:
+    """
+    List *.json files below root with os.scandir.
+    
+    DirEntry.is_file()/is_dir() use the d_type from the directory read, so no
+    per-entry stat() is needed; a missing directory yields nothing.
+    """
+    found: List[str] = []
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".json") and entry.is_file():
+                        found.append(entry.path)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return found
+
 
 class TrajectoryProcessor(FileSystemEventHandler):
     """Processes CUA trajectory files in real-time and stores in MongoDB."""
@@ -33,6 +68,7 @@ class TrajectoryProcessor(FileSystemEventHandler):
         self.mongo = mongo_client
         self.task_id = task_id
         self.processed_files = set()
+        self._uploads: List[Future] = []
         
         # Ensure directory exists
         self.trajectory_dir.mkdir(parents=True, exist_ok=True)
@@ -40,14 +76,20 @@ class TrajectoryProcessor(FileSystemEventHandler):
         # Process existing files
         self._process_existing()
     
+    def _submit_upload(self, store, source: str):
+        """Queue a screenshot store on the shared upload pool."""
+        self._uploads.append(_UPLOAD_POOL.submit(store, source))
+    
+    def wait_for_uploads(self):
+        """Block until every screenshot upload queued by this processor has finished."""
+        pending, self._uploads = self._uploads, []
+        wait(pending)
+    
     def _process_existing(self):
         """Process any existing trajectory files."""
-        if not self.trajectory_dir.exists():
-            return
-        
-        for file_path in self.trajectory_dir.rglob("*.json"):
-            if str(file_path) not in self.processed_files:
-                self._process_file(file_path)
+        for file_path in _scan_json_files(str(self.trajectory_dir)):
+            if file_path not in self.processed_files:
+                self._process_file(Path(file_path))
     
     def _process_file(self, file_path: Path):
         """Process a single trajectory file."""
@@ -85,21 +127,21 @@ class TrajectoryProcessor(FileSystemEventHandler):
                                     if image_url and isinstance(image_url, str):
                                         print(f"[TrajectoryProcessor] Found image in content: {image_url[:50]}...")
                                         if image_url.startswith("data:image"):
-                                            self._store_screenshot_base64(image_url)
+                                            self._submit_upload(self._store_screenshot_base64, image_url)
                                         elif Path(image_url).exists():
-                                            self._store_screenshot(image_url)
+                                            self._submit_upload(self._store_screenshot, image_url)
                 
                 # Extract screenshots from computer_call_output
                 if "type" in data and data.get("type") == "computer_call_output":
                     screenshot_path = data.get("screenshot_path") or data.get("image_path")
                     if screenshot_path:
                         print(f"[TrajectoryProcessor] Found screenshot_path: {screenshot_path}")
-                        self._store_screenshot(screenshot_path)
+                        self._submit_upload(self._store_screenshot, screenshot_path)
                     
                     image_data = data.get("image") or data.get("screenshot")
                     if image_data and isinstance(image_data, str) and image_data.startswith("data:image"):
                         print(f"[TrajectoryProcessor] Found base64 image in computer_call_output")
-                        self._store_screenshot_base64(image_data)
+                        self._submit_upload(self._store_screenshot_base64, image_data)
                 
                 # Check for nested trajectory data
                 if "trajectory" in data:
@@ -141,13 +183,14 @@ class TrajectoryProcessor(FileSystemEventHandler):
     def _store_screenshot_base64(self, base64_data: str):
         """Store screenshot from base64 data URL."""
         try:
-            # Extract base64 part from data URL
-            if "," in base64_data:
-                base64_part = base64_data.split(",", 1)[1]
-            else:
-                base64_part = base64_data
+            # Extract base64 part from data URL; both decoders accept the str directly
+            base64_part = base64_data[base64_data.find(",") + 1:]
             
-            image_data = base64.b64decode(base64_part)
+            if PYBASE64_AVAILABLE:
+                # SIMD decoder; same output as the stdlib
+                image_data = pybase64.b64decode(base64_part, validate=False)
+            else:
+                image_data = base64.b64decode(base64_part)
             
             screenshot_id = self.mongo.store_screenshot(
                 task_id=self.task_id,
@@ -167,9 +210,9 @@ class TrajectoryProcessor(FileSystemEventHandler):
                     value = trajectory_data[key]
                     if isinstance(value, str):
                         if value.startswith("data:image"):
-                            self._store_screenshot_base64(value)
+                            self._submit_upload(self._store_screenshot_base64, value)
                         elif Path(value).exists():
-                            self._store_screenshot(value)
+                            self._submit_upload(self._store_screenshot, value)
             
             # Recursively process nested dicts
             for value in trajectory_data.values():
@@ -201,6 +244,8 @@ def start_processor(trajectory_dir: Path, mongo_client: MongoClientWrapper, task
     """Start watching trajectory directory."""
     processor = TrajectoryProcessor(trajectory_dir, mongo_client, task_id)
     observer = Observer()
+    # Kept on the observer so the caller can wait for this task's uploads
+    observer.processor = processor
     observer.schedule(processor, str(trajectory_dir), recursive=True)
     observer.start()
     return observer
@@ -2,12 +2,19 @@
 """Agent runner that polls for tasks and executes them using execute_task.py."""
 
 import os
+import re
+import json
+import errno
+import select
 import subprocess
 import time
 import threading
+import heapq
 import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple, Callable, Dict, List
 from datetime import datetime
 from uuid import uuid4
 
@@ -17,10 +24,185 @@ from .db_adapters import PostgresClient, MongoClientWrapper
 
 # Removed: list_new_screenshots - CUA trajectory processor handles screenshots
 
+# Agent response block printed by execute_task.py between "=" * 60 separator lines
+_RESPONSE_RE = re.compile(r"AGENT_RESPONSE_START\n(?:=+\n)?(.*?)\n?(?:=+\n)?AGENT_RESPONSE_END", re.DOTALL)
+# Without the markers, only this many trailing characters of stdout become the task response
+RESPONSE_FALLBACK_MAX = 4096
+
+# Task workdirs go on tmpfs when it has room for a task's screenshots and trajectories
+SHM_WORKDIR_ROOT = "/dev/shm/agent_work"
+DISK_WORKDIR_ROOT = "/tmp/agent_work"
+SHM_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+
+def _pick_workdir_root() -> str:
+    """Return the tmpfs workdir root if /dev/shm is writable and large enough, else /tmp."""
+    try:
+        if os.access("/dev/shm", os.W_OK):
+            st = os.statvfs("/dev/shm")
+            if st.f_bavail * st.f_frsize >= SHM_MIN_FREE_BYTES:
+                return SHM_WORKDIR_ROOT
+    except OSError:
+        pass
+    return DISK_WORKDIR_ROOT
+
+
+# Only the last this-many lines of execute_task.py stdout/stderr are kept in memory
+STREAM_TAIL_LINES = 10000
+
+
+class _StreamTail:
+    """The last STREAM_TAIL_LINES lines of a stream, plus its total length in characters."""
+    
+    __slots__ = ("lines", "length")
+    
+    def __init__(self):
+        self.lines: deque = deque(maxlen=STREAM_TAIL_LINES)
+        self.length = 0
+    
+    def feed(self, lines) -> "_StreamTail":
+        for line in lines:
+            self.lines.append(line)
+            self.length += len(line)
+        return self
+    
+    def text(self) -> str:
+        return "".join(self.lines)
+
+
+def _drain_stream(stream, sink: _StreamTail):
+    """Read a subprocess pipe line by line into a bounded tail until EOF."""
+    try:
+        sink.feed(iter(stream.readline, ""))
+    finally:
+        stream.close()
+
+
+def _wait_child(proc: subprocess.Popen, timeout: float) -> int:
+    """
+    Wait for proc to exit, blocking in a single poll() on a pidfd where available.
+    
+    Popen.wait(timeout=...) polls waitpid() with short sleeps; a pidfd becomes
+    readable when the child exits, so the wait costs one wakeup.
+    
+    Raises:
+        subprocess.TimeoutExpired: If proc is still running after timeout seconds
+    """
+    try:
+        pidfd = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        # No pidfd support (Python < 3.9, non-Linux, kernel < 5.3)
+        return proc.wait(timeout=timeout)
+    try:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+        if not poller.poll(timeout * 1000):
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+    finally:
+        os.close(pidfd)
+    return proc.wait()
+
+
+def _pin_process(pid: int, cpu: Optional[int]):
+    """Restrict a child process (and anything it spawns later) to one CPU, where supported."""
+    if cpu is None or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        os.sched_setaffinity(pid, {cpu})
+    except OSError as e:
+        print(f"Warning: Failed to pin process {pid} to CPU {cpu}: {e}")
+
+
+# stdout/stderr longer than this are logged as their head and tail only
+LOG_TEXT_MAX = 64 * 1024
+
+
+def _truncate(text: str, limit: int = LOG_TEXT_MAX) -> str:
+    """Keep the first and last limit/2 characters of text, marking what was cut."""
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n... [truncated {len(text) - limit} chars] ...\n{text[-half:]}"
+
+
+# Files (in the task workdir) the persistent execute_task.py worker writes a task's stdout/stderr to
+WORKER_STDOUT_FILE = "execute_task.stdout"
+WORKER_STDERR_FILE = "execute_task.stderr"
+
+
+def _read_tail(path: str) -> _StreamTail:
+    """Stream a file into a _StreamTail (empty if the file doesn't exist)."""
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return _StreamTail().feed(f)
+    except FileNotFoundError:
+        return _StreamTail()
+
+
+class HeartbeatScheduler:
+    """
+    One long-lived daemon thread that calls beat(task_id) periodically for every
+    registered task, instead of a thread started and joined per task.
+    
+    Deadlines live in a heap; each registration gets a token so entries left over
+    from an earlier registration of the same task are discarded.
+    """
+    
+    def __init__(self, beat: Callable[[int], None]):
+        self._beat = beat
+        self._heap: List[Tuple[float, int, int]] = []
+        self._tasks: Dict[int, Tuple[float, int]] = {}
+        self._tokens = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+    
+    def register(self, task_id: int, interval: float):
+        """Beat for task_id now and then every interval seconds until unregistered."""
+        with self._cond:
+            self._tokens += 1
+            self._tasks[task_id] = (interval, self._tokens)
+            heapq.heappush(self._heap, (time.monotonic(), self._tokens, task_id))
+            self._cond.notify()
+    
+    def unregister(self, task_id: int):
+        """Stop beating for task_id (no-op if not registered)."""
+        with self._cond:
+            self._tasks.pop(task_id, None)
+            self._cond.notify()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    # Drop entries whose registration is gone or superseded
+                    while self._heap and self._tasks.get(self._heap[0][2], (None, None))[1] != self._heap[0][1]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    deadline, token, task_id = self._heap[0]
+                    delay = deadline - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                interval = self._tasks[task_id][0]
+                heapq.heapreplace(self._heap, (max(deadline + interval, time.monotonic()), token, task_id))
+            try:
+                self._beat(task_id)
+            except Exception:
+                pass  # Ignore errors in heartbeat
+
 
 class AgentRunner:
     """Agent runner that polls for tasks and executes them."""
     
+    __slots__ = (
+        "config", "postgres", "mongo", "running", "current_workdir", "_log_prefix",
+        "_task_env", "_execute_task_script", "_execute_task_script_found", "_worker",
+        "_workdir_root", "_heartbeats", "_cleanup_executor"
+    )
+    
     def __init__(
         self,
         config: Config,
@@ -40,6 +222,26 @@ class AgentRunner:
         self.mongo = mongo_client
         self.running = False
         self.current_workdir: Optional[str] = None
+        self._log_prefix = f"[{config.agent_id}]"
+        
+        # Environment for execute_task.py, copied once; only the per-task
+        # variables are overwritten for each run (tasks run one at a time)
+        self._task_env = os.environ.copy()
+        self._task_env["MONGO_URI"] = self.config.mongo_uri
+        self._task_env["AGENT_ID"] = self.config.agent_id
+        
+        # execute_task.py sits next to this module; resolve it once, not per task
+        self._execute_task_script = Path(__file__).parent / "execute_task.py"
+        self._execute_task_script_found = self._execute_task_script.exists()
+        
+        # Long-lived execute_task.py --server process, started on first use (see _run_in_worker)
+        self._worker: Optional[subprocess.Popen] = None
+        
+        self._workdir_root = _pick_workdir_root()
+        self._heartbeats = HeartbeatScheduler(self._send_heartbeat)
+        
+        # Workdirs are removed in the background so the next poll doesn't wait on rmtree
+        self._cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workdir-cleanup")
     
     def poll_loop(self):
         """Main polling loop that runs indefinitely."""
@@ -49,27 +251,28 @@ class AgentRunner:
             level="info",
             message=f"Agent worker started (agent_id={self.config.agent_id})"
         )
-        print(f"[{self.config.agent_id}] Agent worker started")
+        print(f"{self._log_prefix} Agent worker started")
+        
+        # Wake up as soon as a task is created instead of sleeping out the poll interval;
+        # the interval remains the fallback for missed notifications
+        self.postgres.listen()
         
         while self.running:
             try:
-                # Poll for current task
-                task = self.postgres.get_current_task()
+                # Poll for current task and its progress in one query
+                task, progress = self.postgres.get_current_task_with_progress()
                 
                 if not task:
-                    # No task available, sleep and continue
-                    print(f"[{self.config.agent_id}] No task found, polling again in {self.config.poll_interval_seconds}s...")
-                    time.sleep(self.config.poll_interval_seconds)
+                    # No task available, wait for a notification (or the poll interval) and continue
+                    print(f"{self._log_prefix} No task found, polling again in {self.config.poll_interval_seconds}s...")
+                    self.postgres.wait_for_notify(self.config.poll_interval_seconds)
                     continue
                 
                 task_id = task["id"]
                 
-                # Check progress
-                progress = self.postgres.get_task_progress_max_percent(task_id)
-                
                 if progress >= 100:
                     # Task already completed, skip
-                    time.sleep(self.config.poll_interval_seconds)
+                    self.postgres.wait_for_notify(self.config.poll_interval_seconds)
                     continue
                 
                 # Task found and not completed, execute it
@@ -78,7 +281,7 @@ class AgentRunner:
             except Exception as e:
                 # Log error and continue polling
                 error_msg = f"Error in poll loop: {str(e)}"
-                print(f"[{self.config.agent_id}] ERROR: {error_msg}")
+                print(f"{self._log_prefix} ERROR: {error_msg}")
                 self.mongo.write_log(
                     task_id=None,
                     level="error",
@@ -92,7 +295,8 @@ class AgentRunner:
             level="info",
             message="Agent worker stopped"
         )
-        print(f"[{self.config.agent_id}] Agent worker stopped")
+        self._stop_worker()
+        print(f"{self._log_prefix} Agent worker stopped")
     
     def _execute_task(self, task: dict):
         """
@@ -102,21 +306,28 @@ class AgentRunner:
             task: Task dictionary from database
         """
         task_id = task["id"]
+        agent_id = self.config.agent_id
         workdir = None
         original_cwd = os.getcwd()  # Save original working directory early
         
         try:
-            # Create unique working directory
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
-            workdir = f"/tmp/agent_work/{self.config.agent_id}/{task_id}/{timestamp}"
+            # Create unique working directory (hex microsecond clock + random suffix,
+            # no strftime and no collision between runs in the same microsecond)
+            timestamp = f"{time.time_ns() // 1000:x}_{uuid4().hex[:8]}"
+            workdir = f"{self._workdir_root}/{agent_id}/{task_id}/{timestamp}"
+            # One makedirs call creates the workdir and its screenshots directory
+            try:
+                os.makedirs(os.path.join(workdir, "screenshots"), exist_ok=True)
+            except OSError as e:
+                if e.errno != errno.ENOSPC or self._workdir_root == DISK_WORKDIR_ROOT:
+                    raise
+                # tmpfs is full: use disk from now on
+                self._workdir_root = DISK_WORKDIR_ROOT
+                workdir = f"{self._workdir_root}/{agent_id}/{task_id}/{timestamp}"
+                os.makedirs(os.path.join(workdir, "screenshots"), exist_ok=True)
             workdir_path = Path(workdir)
-            workdir_path.mkdir(parents=True, exist_ok=True)
             self.current_workdir = workdir
             
-            # Create screenshots directory
-            screenshots_dir = workdir_path / "screenshots"
-            screenshots_dir.mkdir(exist_ok=True)
-            
             # Log task picked
             self.mongo.write_log(
                 task_id=task_id,
@@ -124,24 +335,18 @@ class AgentRunner:
                 message=f"Task picked: {task.get('title', 'Unknown')}",
                 meta={"task_id": task_id, "title": task.get("title")}
             )
-            print(f"[{self.config.agent_id}] Task {task_id} picked: {task.get('title', 'Unknown')}")
+            print(f"{self._log_prefix} Task {task_id} picked: {task.get('title', 'Unknown')}")
             
             # Insert initial progress
             self.postgres.insert_progress(
                 task_id=task_id,
-                agent_id=self.config.agent_id,
+                agent_id=agent_id,
                 percent=0,
                 message="Task started"
             )
             
-            # Start heartbeat thread for progress updates
-            heartbeat_stop = threading.Event()
-            heartbeat_thread = threading.Thread(
-                target=self._heartbeat_loop,
-                args=(task_id, heartbeat_stop),
-                daemon=True
-            )
-            heartbeat_thread.start()
+            # Start heartbeats
+            self._heartbeats.register(task_id, self.config.heartbeat_interval_seconds)
             
             # Get task description
             task_description = task.get("description", "") or task.get("title", "")
@@ -149,46 +354,47 @@ class AgentRunner:
                 task_description = f"Task {task_id}"
             
             # Execute task using execute_task.py script
-            execute_task_script = Path(__file__).parent / "execute_task.py"
-            if not execute_task_script.exists():
+            execute_task_script = self._execute_task_script
+            if not self._execute_task_script_found:
                 error_msg = f"execute_task.py not found at {execute_task_script}"
-                print(f"[{self.config.agent_id}] ERROR: {error_msg}")
+                print(f"{self._log_prefix} ERROR: {error_msg}")
                 self.mongo.write_log(task_id=task_id, level="error", message=error_msg)
-                self.postgres.insert_progress(task_id=task_id, agent_id=self.config.agent_id, percent=0, message=error_msg)
+                self.postgres.insert_progress(task_id=task_id, agent_id=agent_id, percent=0, message=error_msg)
                 return
             
             start_time = time.time()
             try:
                 # Pass task description and MongoDB connection info as environment variables
-                env = os.environ.copy()
+                env = self._task_env
                 env["TASK_DESCRIPTION"] = task_description
                 env["TASK_ID"] = str(task_id)
-                env["MONGO_URI"] = self.config.mongo_uri
-                env["AGENT_ID"] = self.config.agent_id
                 env["WORKDIR"] = str(workdir_path)
-                print(f"[{self.config.agent_id}] Executing task {task_id} with env: TASK_ID={task_id}, WORKDIR={workdir_path}")
+                print(f"{self._log_prefix} Executing task {task_id} with env: TASK_ID={task_id}, WORKDIR={workdir_path}")
                 
-                result = subprocess.run(
-                    ["python", str(execute_task_script), task_description],
-                    cwd=str(workdir_path),
-                    capture_output=True,
-                    text=True,
-                    timeout=self.config.run_task_timeout_seconds,
-                    env=env
-                )
+                if self.config.persistent_task_worker:
+                    return_code, stdout_tail, stderr_tail = self._run_in_worker(
+                        task_id,
+                        task_description,
+                        workdir,
+                        timeout=self.config.run_task_timeout_seconds
+                    )
+                else:
+                    return_code, stdout_tail, stderr_tail = self._run_streaming(
+                        ["python", str(execute_task_script), task_description],
+                        cwd=str(workdir_path),
+                        env=env,
+                        timeout=self.config.run_task_timeout_seconds
+                    )
                 end_time = time.time()
                 duration = end_time - start_time
                 
                 # Stop heartbeat
-                heartbeat_stop.set()
-                heartbeat_thread.join(timeout=1)
-                
-                # Get stdout and stderr
-                stdout = result.stdout or ""
-                stderr = result.stderr or ""
-                return_code = result.returncode
+                self._heartbeats.unregister(task_id)
                 
                 # Log execution result
+                # Lengths cover the whole output, not just the tail kept in memory
+                stdout, stderr = stdout_tail.text(), stderr_tail.text()
+                stdout_length, stderr_length = stdout_tail.length, stderr_tail.length
                 self.mongo.write_log(
                     task_id=task_id,
                     level="info" if return_code == 0 else "error",
@@ -196,25 +402,25 @@ class AgentRunner:
                     meta={
                         "return_code": return_code,
                         "duration": duration,
-                        "stdout_length": len(stdout),
-                        "stderr_length": len(stderr)
+                        "stdout_length": stdout_length,
+                        "stderr_length": stderr_length
                     }
                 )
                 
-                # Write full stdout/stderr to logs
+                # Write stdout/stderr to logs, capped so huge output stays well under the BSON size limit
                 if stdout:
                     self.mongo.write_log(
                         task_id=task_id,
                         level="info",
                         message="execute_task.py stdout",
-                        meta={"stdout": stdout}
+                        meta={"length": stdout_length, "stdout": _truncate(stdout)}
                     )
                 if stderr:
                     self.mongo.write_log(
                         task_id=task_id,
                         level="warning" if return_code == 0 else "error",
                         message="execute_task.py stderr",
-                        meta={"stderr": stderr}
+                        meta={"length": stderr_length, "stderr": _truncate(stderr)}
                     )
                 
                 # Screenshots are handled by CUA trajectory processor
@@ -237,39 +443,19 @@ class AgentRunner:
                 # Insert final progress
                 self.postgres.insert_progress(
                     task_id=task_id,
-                    agent_id=self.config.agent_id,
+                    agent_id=agent_id,
                     percent=final_percent,
                     message=f"completed (return_code={return_code}, screenshots={screenshot_count})"
                 )
                 
                 # Update task response
                 # Extract agent response from stdout (between AGENT_RESPONSE_START and AGENT_RESPONSE_END markers)
-                response_text = ""
-                if "AGENT_RESPONSE_START" in stdout and "AGENT_RESPONSE_END" in stdout:
-                    # Extract response between markers
-                    start_idx = stdout.find("AGENT_RESPONSE_START")
-                    end_idx = stdout.find("AGENT_RESPONSE_END")
-                    if start_idx != -1 and end_idx != -1:
-                        # Get content between markers
-                        response_section = stdout[start_idx:end_idx]
-                        # Extract lines between the markers (skip the marker lines themselves)
-                        lines = response_section.split('\n')
-                        response_lines = []
-                        in_response = False
-                        separator = "=" * 60
-                        for line in lines:
-                            if "AGENT_RESPONSE_START" in line or separator in line:
-                                in_response = True
-                                continue
-                            if "AGENT_RESPONSE_END" in line:
-                                break
-                            if in_response and line.strip() and separator not in line:
-                                response_lines.append(line)
-                        response_text = '\n'.join(response_lines).strip()
+                match = _RESPONSE_RE.search(stdout)
+                response_text = match.group(1).strip() if match else ""
                 
-                # Fallback: use entire stdout if markers not found
+                # Fallback: use the end of stdout if markers not found
                 if not response_text:
-                    response_text = stdout.strip()
+                    response_text = stdout[-RESPONSE_FALLBACK_MAX:].strip()
                 
                 # Final fallback: use summary if stdout is empty
                 if not response_text:
@@ -283,18 +469,18 @@ class AgentRunner:
                         metadata={"completed_at": datetime.utcnow().isoformat(), "return_code": return_code, "screenshots": screenshot_count}
                     )
                 except Exception as e:
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task status: {e}")
+                    print(f"{self._log_prefix} Warning: Failed to update task status: {e}")
                 
                 # Update task response (wrap in try/except to handle transaction errors gracefully)
                 try:
                     self.postgres.update_task_response(
                         task_id=task_id,
-                        agent_id=self.config.agent_id,
+                        agent_id=agent_id,
                         response_text=response_text
                     )
                 except Exception as e:
                     # Log error but don't fail the task execution
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task response: {e}")
+                    print(f"{self._log_prefix} Warning: Failed to update task response: {e}")
                     self.mongo.write_log(
                         task_id=task_id,
                         level="warning",
@@ -305,20 +491,19 @@ class AgentRunner:
                 if final_percent < 100:
                     self.postgres.insert_progress(
                         task_id=task_id,
-                        agent_id=self.config.agent_id,
+                        agent_id=agent_id,
                         percent=100,
                         message="completed"
                     )
                 
-                print(f"[{self.config.agent_id}] Task {task_id} completed (return_code={return_code})")
+                print(f"{self._log_prefix} Task {task_id} completed (return_code={return_code})")
                 
             except subprocess.TimeoutExpired:
                 # Task timed out
-                heartbeat_stop.set()
-                heartbeat_thread.join(timeout=1)
+                self._heartbeats.unregister(task_id)
                 
                 error_msg = f"execute_task.py timed out after {self.config.run_task_timeout_seconds} seconds"
-                print(f"[{self.config.agent_id}] ERROR: {error_msg}")
+                print(f"{self._log_prefix} ERROR: {error_msg}")
                 self.mongo.write_log(
                     task_id=task_id,
                     level="error",
@@ -327,7 +512,7 @@ class AgentRunner:
                 
                 self.postgres.insert_progress(
                     task_id=task_id,
-                    agent_id=self.config.agent_id,
+                    agent_id=agent_id,
                     percent=0,
                     message=error_msg
                 )
@@ -340,18 +525,18 @@ class AgentRunner:
                         metadata={"failed_at": datetime.utcnow().isoformat(), "error": error_msg}
                     )
                 except Exception as e:
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task status: {e}")
+                    print(f"{self._log_prefix} Warning: Failed to update task status: {e}")
                 
                 # Update task response (wrap in try/except to handle transaction errors gracefully)
                 try:
                     self.postgres.update_task_response(
                         task_id=task_id,
-                        agent_id=self.config.agent_id,
+                        agent_id=agent_id,
                         response_text=error_msg
                     )
                 except Exception as e:
                     # Log error but don't fail the task execution
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task response: {e}")
+                    print(f"{self._log_prefix} Warning: Failed to update task response: {e}")
             
             finally:
                 # Restore original working directory
@@ -363,7 +548,7 @@ class AgentRunner:
         except Exception as e:
             # Log error
             error_msg = f"Error executing task {task_id}: {str(e)}"
-            print(f"[{self.config.agent_id}] ERROR: {error_msg}")
+            print(f"{self._log_prefix} ERROR: {error_msg}")
             self.mongo.write_log(
                 task_id=task_id,
                 level="error",
@@ -375,7 +560,7 @@ class AgentRunner:
             try:
                 self.postgres.insert_progress(
                     task_id=task_id,
-                    agent_id=self.config.agent_id,
+                    agent_id=agent_id,
                     percent=0,
                     message=error_msg
                 )
@@ -393,38 +578,164 @@ class AgentRunner:
                 pass
         
         finally:
+            # Heartbeats never outlive the task, whichever path it ended on
+            self._heartbeats.unregister(task_id)
+            
             # Cleanup workdir
-            if workdir and os.path.exists(workdir):
-                try:
-                    shutil.rmtree(workdir)
-                except Exception as e:
-                    print(f"[{self.config.agent_id}] Warning: Failed to cleanup workdir {workdir}: {e}")
+            if workdir:
+                self._cleanup_executor.submit(self._remove_workdir, workdir)
             self.current_workdir = None
     
-    def _heartbeat_loop(self, task_id: int, stop_event: threading.Event):
+    def _remove_workdir(self, workdir: str):
+        """Delete a finished task's working directory (runs on the cleanup thread)."""
+        if not os.path.exists(workdir):
+            return
+        try:
+            shutil.rmtree(workdir)
+        except Exception as e:
+            print(f"{self._log_prefix} Warning: Failed to cleanup workdir {workdir}: {e}")
+    
+    def _run_streaming(self, args: list, cwd: str, env: dict, timeout: int) -> Tuple[int, _StreamTail, _StreamTail]:
         """
-        Heartbeat loop that writes progress updates while task is running.
+        Run a subprocess, reading stdout/stderr incrementally instead of buffering them whole.
+        
+        Reader threads keep the last STREAM_TAIL_LINES lines of each stream, so a
+        chatty task can't grow the worker's memory without bound.
+        
+        Args:
+            args: Command line
+            cwd: Working directory
+            env: Environment
+            timeout: Seconds before the process is killed
+            
+        Returns:
+            (return code, stdout tail, stderr tail), each tail with the stream's total length
+            
+        Raises:
+            subprocess.TimeoutExpired: If the process ran longer than timeout (it is killed)
+        """
+        proc = subprocess.Popen(
+            args,
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        _pin_process(proc.pid, self.config.agent_cpu)
+        stdout_tail = _StreamTail()
+        stderr_tail = _StreamTail()
+        readers = [
+            threading.Thread(target=_drain_stream, args=(proc.stdout, stdout_tail), daemon=True),
+            threading.Thread(target=_drain_stream, args=(proc.stderr, stderr_tail), daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            _wait_child(proc, timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise
+        finally:
+            # Grandchildren may still hold the pipes open; don't wait on them forever
+            for reader in readers:
+                reader.join(timeout=5)
+        return proc.returncode, stdout_tail, stderr_tail
+    
+    def _run_in_worker(self, task_id: int, task_description: str, workdir: str, timeout: int) -> Tuple[int, _StreamTail, _StreamTail]:
+        """
+        Run a task in the persistent execute_task.py worker, starting it if needed.
+        
+        Saves the interpreter start-up and CUA imports a fresh process pays per
+        task. The worker writes the task's stdout/stderr to files in workdir and
+        replies with the exit code, so callers see the same result as _run_streaming.
         
         Args:
             task_id: Task identifier
-            stop_event: Event to stop the heartbeat
+            task_description: Task description
+            workdir: Task working directory
+            timeout: Seconds before the worker is killed (a new one starts on the next task)
+            
+        Returns:
+            (return code, stdout tail, stderr tail), each tail with the stream's total length
+            
+        Raises:
+            subprocess.TimeoutExpired: If the task ran longer than timeout
+            RuntimeError: If the worker exited mid-task
         """
-        while not stop_event.is_set():
+        if self._worker is None or self._worker.poll() is not None:
+            # The worker's own stderr (and stdout between tasks) goes to this process's stderr
+            self._worker = subprocess.Popen(
+                ["python", "-u", str(self._execute_task_script), "--server"],
+                env=self._task_env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True
+            )
+            _pin_process(self._worker.pid, self.config.agent_cpu)
+        worker = self._worker
+        stdout_path = os.path.join(workdir, WORKER_STDOUT_FILE)
+        stderr_path = os.path.join(workdir, WORKER_STDERR_FILE)
+        request = {
+            "task_id": task_id,
+            "description": task_description,
+            "workdir": workdir,
+            "stdout_path": stdout_path,
+            "stderr_path": stderr_path
+        }
+        try:
+            worker.stdin.write(json.dumps(request) + "\n")
+            worker.stdin.flush()
+            ready, _, _ = select.select([worker.stdout], [], [], timeout)
+            reply = worker.stdout.readline() if ready else None
+        except OSError:
+            reply = ""
+        
+        if reply is None:
+            self._stop_worker(graceful=False)
+            raise subprocess.TimeoutExpired(worker.args, timeout)
+        if not reply:
+            self._stop_worker(graceful=False)
+            raise RuntimeError("execute_task.py worker exited while running the task")
+        
+        return_code = json.loads(reply)["return_code"]
+        return return_code, _read_tail(stdout_path), _read_tail(stderr_path)
+    
+    def _stop_worker(self, graceful: bool = True):
+        """Stop the persistent execute_task.py worker, if one is running."""
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        if graceful:
+            # EOF on stdin ends the worker's request loop
             try:
-                self.postgres.insert_progress(
-                    task_id=task_id,
-                    agent_id=self.config.agent_id,
-                    percent=None,
-                    message="working..."
-                )
-            except:
-                pass  # Ignore errors in heartbeat
-            
-            # Sleep for poll interval, or until stop event
-            if stop_event.wait(self.config.poll_interval_seconds):
-                break
+                worker.stdin.close()
+                worker.wait(timeout=5)
+                return
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        worker.kill()
+        worker.wait()
+        for stream in (worker.stdin, worker.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+    
+    def _send_heartbeat(self, task_id: int):
+        """
+        Record a heartbeat while a task is running.
+        
+        Args:
+            task_id: Task identifier
+        """
+        self.postgres.touch_heartbeat(task_id, self.config.agent_id)
     
     def stop(self):
         """Stop the polling loop gracefully."""
         self.running = False
+        self._stop_worker()
+        # Don't leave queued log entries behind if the process exits right after
+        self.mongo.flush_logs()
 
@@ -7,5 +7,6 @@ Centralized storage layer for logs, progress, and binary data.
 
 from .mongo_adapter import MongoAdapter
 from .postgres_adapter import PostgresAdapter
-__all__ = ["MongoAdapter", "PostgresAdapter"]
+from .minio_adapter import MinIOAdapter
+__all__ = ["MongoAdapter", "PostgresAdapter", "MinIOAdapter"]
 
@@ -0,0 +1,196 @@
+"""
+MinIO Adapter
+=============
+
+Adapter for screenshots and other binary files stored in MinIO.
+Objects live under an {agent_id}/ prefix; their metadata is registered in
+PostgreSQL so readers never have to list MinIO.
+"""
+
+import io
+import os
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+import urllib3
+from minio import Minio
+
+
+SCREENSHOTS_BUCKET = "screenshots"
+BINARIES_BUCKET = "binaries"
+
+# Objects at least this large are uploaded as parallel multipart uploads
+MULTIPART_PART_SIZE = 5 * 1024 * 1024
+
+
+class MinIOAdapter:
+    """
+    MinIO adapter for screenshots and binary files.
+
+    Agents: Full read/write to their own namespace (agent_id/)
+    Frontend: Read via presigned URLs
+    """
+
+    def __init__(
+        self,
+        agent_id: Optional[str] = None,
+        postgres_adapter: Optional[Any] = None,
+        endpoint: Optional[str] = None,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        secure: Optional[bool] = None
+    ):
+        """
+        Initialize MinIO adapter.
+
+        Args:
+            agent_id: Agent identifier (object prefix). If None, uses AGENT_ID env var.
+            postgres_adapter: Optional PostgresAdapter used to register file metadata
+            endpoint: MinIO endpoint (host:port). If None, uses MINIO_ENDPOINT env var.
+            access_key: Access key. If None, uses MINIO_ACCESS_KEY env var.
+            secret_key: Secret key. If None, uses MINIO_SECRET_KEY env var.
+            secure: Use HTTPS. If None, uses MINIO_SECURE env var (default false).
+        """
+        self.agent_id = agent_id or os.getenv("AGENT_ID", "agent1")
+        self.postgres_adapter = postgres_adapter
+
+        if secure is None:
+            secure = os.getenv("MINIO_SECURE", "false").lower() in ("1", "true", "yes")
+
+        # One pooled HTTP client keeps connections (and TLS sessions) alive across uploads
+        self.client = Minio(
+            endpoint or os.getenv("MINIO_ENDPOINT", "localhost:9000"),
+            access_key=access_key or os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
+            secret_key=secret_key or os.getenv("MINIO_SECRET_KEY", "minioadmin"),
+            secure=secure,
+            http_client=urllib3.PoolManager(
+                num_pools=4,
+                maxsize=16,
+                block=True,
+                retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+            )
+        )
+
+        # Buckets are checked once here, never per upload
+        for bucket in (SCREENSHOTS_BUCKET, BINARIES_BUCKET):
+            if not self.client.bucket_exists(bucket):
+                self.client.make_bucket(bucket)
+
+    def upload_screenshot(
+        self,
+        file_data: bytes,
+        task_id: Optional[int] = None,
+        filename: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Upload a PNG screenshot to the agent's namespace.
+
+        Args:
+            file_data: Screenshot bytes
+            task_id: Optional task identifier
+            filename: Optional object filename (generated when omitted)
+            metadata: Optional metadata registered alongside the object
+
+        Returns:
+            Object path within the screenshots bucket
+        """
+        if not filename:
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+            filename = f"{task_id or 'none'}_{stamp}_{uuid.uuid4().hex[:8]}.png"
+        object_path = f"{self.agent_id}/screenshots/{filename}"
+
+        return self._put(SCREENSHOTS_BUCKET, object_path, file_data, "image/png", task_id, metadata)
+
+    async def upload_screenshot_async(
+        self,
+        file_data: bytes,
+        task_id: Optional[int] = None,
+        filename: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Run upload_screenshot in a worker thread so the event loop is not blocked."""
+        return await asyncio.to_thread(self.upload_screenshot, file_data, task_id, filename, metadata)
+
+    def upload_file(
+        self,
+        file_data: bytes,
+        relative_path: str,
+        content_type: str = "application/octet-stream",
+        task_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Upload a binary file to the agent's namespace.
+
+        Args:
+            file_data: File bytes
+            relative_path: Path below {agent_id}/ in the binaries bucket
+            content_type: MIME type
+            task_id: Optional task identifier
+            metadata: Optional metadata registered alongside the object
+
+        Returns:
+            Object path within the binaries bucket
+        """
+        object_path = f"{self.agent_id}/{relative_path.lstrip('/')}"
+        return self._put(BINARIES_BUCKET, object_path, file_data, content_type, task_id, metadata)
+
+    def get_presigned_url(self, bucket: str, object_path: str, expires_seconds: int = 3600) -> str:
+        """
+        Get a time-limited download URL for an object.
+
+        Args:
+            bucket: Bucket name
+            object_path: Object path
+            expires_seconds: URL lifetime in seconds
+
+        Returns:
+            Presigned URL
+        """
+        return self.client.presigned_get_object(bucket, object_path, expires=timedelta(seconds=expires_seconds))
+
+    def health_check(self) -> bool:
+        """Return True if MinIO answers a bucket listing."""
+        try:
+            self.client.list_buckets()
+            return True
+        except Exception:
+            return False
+
+    def _put(
+        self,
+        bucket: str,
+        object_path: str,
+        file_data: bytes,
+        content_type: str,
+        task_id: Optional[int],
+        metadata: Optional[Dict[str, Any]]
+    ) -> str:
+        size = len(file_data)
+        if size > MULTIPART_PART_SIZE:
+            self.client.put_object(
+                bucket, object_path, io.BytesIO(file_data), length=size,
+                content_type=content_type, part_size=MULTIPART_PART_SIZE, num_parallel_uploads=3
+            )
+        else:
+            self.client.put_object(bucket, object_path, io.BytesIO(file_data), length=size, content_type=content_type)
+
+        # Metadata registration failures don't block the upload
+        if self.postgres_adapter:
+            try:
+                self.postgres_adapter.register_binary_file(
+                    agent_id=self.agent_id,
+                    object_path=object_path,
+                    bucket=bucket,
+                    content_type=content_type,
+                    task_id=task_id,
+                    size_bytes=size,
+                    metadata=metadata
+                )
+            except Exception as e:
+                print(f"Warning: Failed to register {bucket}/{object_path} metadata: {e}")
+
+        return object_path
@@ -7,6 +7,7 @@ Supports per-agent isolation with clustered read access for evaluator.
 """
 
 import os
+import base64
 from typing import List, Dict, Any, Optional
 from pymongo import MongoClient
 from datetime import datetime
@@ -101,6 +102,7 @@ class MongoAdapter:
         self.logs.create_index("created_at")
         self.logs.create_index("level")
         self.logs.create_index("task_id")
+        self.logs.create_index([("task_id", 1), ("metadata.action.type", 1)])
         
         self.memories.create_index("agent_id")
         self.memories.create_index("created_at")
@@ -144,6 +146,36 @@ class MongoAdapter:
         result = self.logs.insert_one(log_entry)
         return str(result.inserted_id)
     
+    def write_logs(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """
+        Write a batch of log entries to MongoDB in one round-trip.
+        
+        Args:
+            entries: Dicts with level, message and optional task_id, metadata, created_at
+            
+        Returns:
+            List of log entry IDs
+        """
+        if self.cluster_mode:
+            raise ValueError("Cannot write in cluster mode. Use agent-specific adapter.")
+        if not entries:
+            return []
+        
+        docs = []
+        for entry in entries:
+            log_entry = MongoSchema.log_entry(
+                level=entry["level"],
+                message=entry["message"],
+                agent_id=self.agent_id,
+                task_id=entry.get("task_id"),
+                metadata=entry.get("metadata")
+            )
+            if entry.get("created_at"):
+                log_entry["created_at"] = entry["created_at"]
+            docs.append(log_entry)
+        result = self.logs.insert_many(docs, ordered=False, bypass_document_validation=True)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+    
     def read_logs(
         self,
         agent_id: Optional[str] = None,
@@ -362,7 +394,13 @@ class MongoAdapter:
             query["agent_id"] = self.agent_id
         
         cursor = screenshots_collection.find(query).sort("uploaded_at", -1).limit(limit)
-        return list(cursor)
+        screenshots = list(cursor)
+        for doc in screenshots:
+            # Agents store raw bytes; rebuild the data URL the dashboards render
+            if doc.get("data") is not None and "url" not in doc:
+                encoded = base64.b64encode(doc["data"]).decode("ascii")
+                doc["url"] = f"data:{doc.get('content_type', 'image/png')};base64,{encoded}"
+        return screenshots
     
     def close(self):
         """Close MongoDB connections."""